@@ -238,7 +238,7 @@ async def _fetch_loop(settings: Settings) -> None:
 
 def _connect_db(settings: Settings):
     try:
-        return storage.connect(settings.db_url)
+        return storage.acquire(settings.db_url)
     except OperationalError as exc:
         logger.exception("Failed to connect to MySQL")
         raise HTTPException(
@@ -265,7 +265,8 @@ def _latest_snapshot(conn) -> str | None:
         cur.execute("SELECT MAX(ts) FROM port_status")
         row = cur.fetchone()
     if row and row[0]:
-        return str(row[0])
+        value = row[0]
+        return value.isoformat() if isinstance(value, datetime) else str(value)
     return None
 
 
@@ -355,19 +356,19 @@ def _next_fingerprint_run(now: datetime) -> datetime:
 
 def _schedule_fingerprint_jobs(settings: Settings, reference: datetime) -> int:
     try:
-        conn = storage.connect(settings.db_url)
+        conn = storage.acquire(settings.db_url)
     except Exception:
         logger.exception("Unable to connect to schedule fingerprint jobs")
         raise
     try:
         return storage.schedule_station_fingerprints(conn, reference)
     finally:
-        conn.close()
+        storage.release(conn)
 
 
 def _generate_missing_fingerprints(settings: Settings, reference: datetime) -> int:
     try:
-        conn = storage.connect(settings.db_url)
+        conn = storage.acquire(settings.db_url)
     except Exception:
         logger.exception("Unable to connect to generate station fingerprints")
         raise
@@ -400,24 +401,24 @@ def _generate_missing_fingerprints(settings: Settings, reference: datetime) -> i
             generated += 1
         return generated
     finally:
-        conn.close()
+        storage.release(conn)
 
 
 def _dequeue_fingerprint_job(settings: Settings) -> Dict[str, Any] | None:
     try:
-        conn = storage.connect(settings.db_url)
+        conn = storage.acquire(settings.db_url)
     except Exception:
         logger.exception("Unable to connect to claim fingerprint job")
         raise
     try:
         return storage.dequeue_station_fingerprint_job(conn)
     finally:
-        conn.close()
+        storage.release(conn)
 
 
 def _run_fingerprint_job(settings: Settings, job: Dict[str, Any]) -> None:
     try:
-        conn = storage.connect(settings.db_url)
+        conn = storage.acquire(settings.db_url)
     except Exception:
         logger.exception("Unable to connect to process fingerprint job %s", job.get("id"))
         raise
@@ -443,7 +444,7 @@ def _run_fingerprint_job(settings: Settings, job: Dict[str, Any]) -> None:
             logger.exception("Failed to mark fingerprint job %s as failed", job.get("id"))
         raise
     finally:
-        conn.close()
+        storage.release(conn)
 
 
 async def _fingerprint_worker(settings: Settings) -> None:
@@ -536,15 +537,21 @@ def _build_dashboard(
 ) -> Dict[str, Any]:
     conn = _connect_db(settings)
     try:
-        problematic, rule_counts = storage.analyze_chargers(conn, settings.rules)
-        stats = storage.stats_from_db(conn)
-        history = storage.timeline_stats(conn, settings.rules)
-        daily = storage.sessions_per_day(conn, days=daily_days)
-        series = storage.sessions_time_series(conn, days=daily_days, granularity=granularity)
+        now = datetime.now().astimezone()
+        port_history = storage.analysis_history(conn, settings.rules, now=now)
+        problematic, rule_counts = storage.analyze_chargers(
+            conn, settings.rules, now=now, history=port_history
+        )
+        stats = storage.stats_from_db(conn, now=now, history=port_history)
+        history = storage.timeline_stats(conn, settings.rules, now=now, history=port_history)
+        daily = storage.sessions_per_day(conn, days=daily_days, now=now)
+        series = storage.sessions_time_series(
+            conn, days=daily_days, granularity=granularity, now=now
+        )
         db_stats = storage.db_stats(conn)
         updated = _latest_snapshot(conn)
     finally:
-        conn.close()
+        storage.release(conn)
 
     return {
         "problematic": problematic,
@@ -726,7 +733,7 @@ async def charger_details(location_id: str, station_id: str) -> Dict[str, Any]:
         try:
             return storage.charger_sessions(conn, location_id, station_id, limit=20)
         finally:
-            conn.close()
+            storage.release(conn)
 
     sessions = await asyncio.to_thread(_load_sessions)
     if not any(sessions.values()):
@@ -752,7 +759,7 @@ async def station_fingerprint_details(
             storage.save_station_fingerprint(conn, fingerprint)
             return fingerprint
         finally:
-            conn.close()
+            storage.release(conn)
 
     fingerprint = await asyncio.to_thread(_load_fingerprint)
     if fingerprint is None:
@@ -773,7 +780,7 @@ async def location_details(location_id: str) -> Dict[str, Any]:
         try:
             return storage.location_usage(conn, location_id)
         finally:
-            conn.close()
+            storage.release(conn)
 
     details = await asyncio.to_thread(_load_location)
     if details is None:
@@ -863,7 +870,7 @@ async def nearby(
         try:
             return storage.latest_status_by_locations(conn, selected_ids)
         finally:
-            conn.close()
+            storage.release(conn)
 
     status_lookup = await asyncio.to_thread(_load_statuses)
 
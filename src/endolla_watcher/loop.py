@@ -22,11 +22,12 @@ def fetch_once(db_url: str, file: Path | None = None) -> bool:
     data = fetch_data(file)
     records = parse_usage(data)
     logger.debug("Fetched %d records", len(records))
-    conn = storage.connect(db_url)
-    try:
-        return storage.save_snapshot(conn, records)
-    finally:
-        conn.close()
+    with storage.pooled(db_url) as conn:
+        changed = storage.save_snapshot(conn, records)
+        # Retention and statistics refreshes run at most once per interval
+        storage.maybe_prune(conn)
+        storage.maybe_analyze(conn)
+    return changed
 
 
 def update_once(
@@ -38,11 +39,15 @@ def update_once(
     """Generate the HTML report from stored snapshots."""
     logger.debug("Updating report from db_url=%s", db_url)
     start = time.monotonic()
-    conn = storage.connect(db_url)
-    problematic, rule_counts = storage.analyze_chargers(conn, rules)
-    stats = storage.stats_from_db(conn)
-    history = storage.timeline_stats(conn, rules)
-    daily = storage.sessions_per_day(conn)
+    conn = storage.acquire(db_url)
+    now = datetime.now().astimezone()
+    port_history = storage.analysis_history(conn, rules, now=now)
+    problematic, rule_counts = storage.analyze_chargers(
+        conn, rules, now=now, history=port_history
+    )
+    stats = storage.stats_from_db(conn, now=now, history=port_history)
+    history = storage.timeline_stats(conn, rules, now=now, history=port_history)
+    daily = storage.sessions_per_day(conn, now=now)
     db_stats = storage.db_stats(conn)
     db_size = db_stats["size_bytes"] / (1024 * 1024)
     html = render(
@@ -83,7 +88,7 @@ def update_once(
         fname = f"charger_{r.get('location_id')}_{r.get('station_id')}.html"
         (output.parent / fname).write_text(page, encoding="utf-8")
 
-    conn.close()
+    storage.release(conn)
     logger.debug("Wrote output to %s", output)
 
 
@@ -1,7 +1,8 @@
 import argparse
 import logging
+from datetime import datetime
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 import sqlite3
 
@@ -11,7 +12,7 @@ from .logging_utils import setup_logging
 logger = logging.getLogger(__name__)
 
 
-def _iter_sqlite_rows(conn: sqlite3.Connection, batch_size: int) -> Iterable[Tuple]:
+def _iter_sqlite_batches(conn: sqlite3.Connection, batch_size: int) -> Iterable[List[Tuple]]:
     cursor = conn.cursor()
     cursor.execute(
         "SELECT ts, location_id, station_id, port_id, status, last_updated FROM port_status ORDER BY ts"
@@ -20,7 +21,7 @@ def _iter_sqlite_rows(conn: sqlite3.Connection, batch_size: int) -> Iterable[Tup
         rows = cursor.fetchmany(batch_size)
         if not rows:
             break
-        yield from rows
+        yield rows
 
 
 def migrate(sqlite_path: Path, db_url: str, truncate: bool, batch_size: int) -> int:
@@ -31,6 +32,8 @@ def migrate(sqlite_path: Path, db_url: str, truncate: bool, batch_size: int) ->
         if truncate:
             with mysql_conn.cursor() as cur:
                 cur.execute("TRUNCATE TABLE port_status")
+                cur.execute("TRUNCATE TABLE port_sessions")
+                cur.execute("TRUNCATE TABLE port_latest_status")
             mysql_conn.commit()
         else:
             with mysql_conn.cursor() as cur:
@@ -42,19 +45,36 @@ def migrate(sqlite_path: Path, db_url: str, truncate: bool, batch_size: int) ->
                 )
 
         migrated = 0
+        codes: Dict[str | None, int] = {}
         with mysql_conn.cursor() as cur:
-            for row in _iter_sqlite_rows(sqlite_conn, batch_size):
-                cur.execute(
+            for batch in _iter_sqlite_batches(sqlite_conn, batch_size):
+                if any(row[4] not in codes for row in batch):
+                    codes = storage.resolve_status_codes(mysql_conn, [row[4] for row in batch])
+                # SQLite kept ISO strings and status names; MySQL stores UTC
+                # DATETIME values and status codes. executemany sends each
+                # batch as a single multi-row INSERT.
+                cur.executemany(
                     """
                     INSERT INTO port_status (ts, location_id, station_id, port_id, status, last_updated)
                     VALUES (%s, %s, %s, %s, %s, %s)
                     """,
-                    row,
+                    [
+                        (
+                            datetime.fromisoformat(ts),
+                            loc,
+                            sta,
+                            port,
+                            codes.get(status, storage.OTHER_STATUS_CODE),
+                            last_updated,
+                        )
+                        for ts, loc, sta, port, status, last_updated in batch
+                    ],
                 )
-                migrated += 1
-                if migrated % batch_size == 0:
-                    mysql_conn.commit()
+                mysql_conn.commit()
+                migrated += len(batch)
         mysql_conn.commit()
+        storage.backfill_port_sessions(mysql_conn)
+        storage.backfill_latest_status(mysql_conn)
         logger.info("Migrated %d rows", migrated)
         return migrated
     finally:
@@ -1,6 +1,6 @@
 from typing import Iterable, Dict, Any
 
-UNAVAILABLE_STATUSES = {"OUT_OF_ORDER", "UNAVAILABLE"}
+UNAVAILABLE_STATUSES = frozenset({"OUT_OF_ORDER", "UNAVAILABLE"})
 SHORT_SESSION_MAX_MIN = 5
 
 
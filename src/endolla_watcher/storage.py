@@ -1,18 +1,29 @@
 """Persistence helpers backed by a MySQL database."""
 from __future__ import annotations
 
+import atexit
 import json
 import logging
+import multiprocessing
 import os
+import queue
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
-from itertools import groupby
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone, tzinfo
+from itertools import accumulate, groupby, islice, repeat
+from operator import itemgetter
 from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
 from urllib.parse import urlparse, unquote
 
 import pymysql
 from pymysql.connections import Connection
+from pymysql.constants import FIELD_TYPE
 
 from . import stats as stats_mod
 from .rules import Rules
@@ -23,12 +34,105 @@ logger = logging.getLogger(__name__)
 HIGH_DETAIL_DAYS = 7
 MEDIUM_DETAIL_DAYS = 30
 
-UNAVAILABLE_STATUSES = {"OUT_OF_ORDER", "UNAVAILABLE"}
-OCCUPIED_STATUSES = {"IN_USE", "FINISHED", "COMPLETED", "OCCUPIED", "CHARGING"}
-ACTIVE_CHARGING_STATUSES = {"IN_USE", "CHARGING"}
+# Days covered by the quarter-hour dashboard timeline, and the unused-charger
+# windows it reports as unused_1, unused_2 and unused_7
+TIMELINE_DAYS = 7
+TIMELINE_UNUSED_DAYS = (1, 2, 7)
+
+# Minimum time between retention passes run by maybe_prune()
+PRUNE_INTERVAL = timedelta(hours=1)
+
+# Minimum time between index statistics refreshes run by maybe_analyze()
+ANALYZE_INTERVAL = timedelta(days=1)
+ANALYZED_TABLES = ("port_status", "port_sessions", "port_latest_status")
+
+# Rows rewritten per statement by data migrations
+MIGRATION_BATCH_SIZE = 50000
+
+# Rows per multi-row INSERT statement
+INSERT_CHUNK_SIZE = 1000
+
+# Idle connections kept per database by acquire()/release()
+POOL_SIZE = 8
+
+UNAVAILABLE_STATUSES = frozenset({"OUT_OF_ORDER", "UNAVAILABLE"})
+OCCUPIED_STATUSES = frozenset({"IN_USE", "FINISHED", "COMPLETED", "OCCUPIED", "CHARGING"})
+ACTIVE_CHARGING_STATUSES = frozenset({"IN_USE", "CHARGING"})
+
+# Statuses are stored in port_status and held in memory as small integer
+# codes, so rows stay narrow and the analysis loops compare ints instead of
+# strings. Statuses not listed here are assigned a code in the status_codes
+# table the first time they are seen; OTHER_STATUS_CODE is the fallback when
+# that is not possible. The TINYINT auto-increment can reach the fallback
+# code itself, so a status handed that code is dropped again.
+STATUS_CODES: Dict[str | None, int] = {
+    None: 0,
+    "AVAILABLE": 1,
+    "IN_USE": 2,
+    "OUT_OF_ORDER": 3,
+    "UNAVAILABLE": 4,
+    "RESERVED": 5,
+    "FINISHED": 6,
+    "COMPLETED": 7,
+    "OCCUPIED": 8,
+    "CHARGING": 9,
+}
+OTHER_STATUS_CODE = 255
+MISSING_STATUS_CODE = STATUS_CODES[None]
+IN_USE_CODE = STATUS_CODES["IN_USE"]
+UNAVAILABLE_CODES = frozenset(STATUS_CODES[status] for status in UNAVAILABLE_STATUSES)
+UNAVAILABLE_OR_MISSING_CODES = UNAVAILABLE_CODES | {MISSING_STATUS_CODE}
+OCCUPIED_CODES = frozenset(STATUS_CODES[status] for status in OCCUPIED_STATUSES)
+ACTIVE_CHARGING_CODES = frozenset(STATUS_CODES[status] for status in ACTIVE_CHARGING_STATUSES)
+
+# Per-port analysis can be spread over worker processes for large networks
+ANALYSIS_WORKERS_ENV = "ENDOLLA_ANALYSIS_WORKERS"
+PORT_CHUNK_SIZE = 100
 
 PortKey = Tuple[str | None, str | None, str | None]
 
+def _escape_utc_datetime(value: datetime, mapping: Any = None) -> str:
+    """Encode ``value`` as a UTC ``DATETIME`` literal.
+
+    PyMySQL drops ``tzinfo`` when escaping, so aware values are converted to
+    UTC first. Naive values are assumed to already be UTC.
+    """
+
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return pymysql.converters.escape_datetime(value, mapping)
+
+
+@lru_cache(maxsize=65536)
+def _convert_utc_datetime(value: Any) -> Any:
+    """Decode a ``DATETIME`` column as an aware UTC datetime.
+
+    Every port in a snapshot shares its timestamp, so decoded values are
+    memoized and history rows end up sharing datetime objects.
+    """
+
+    parsed = pymysql.converters.convert_datetime(value)
+    if isinstance(parsed, datetime):
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+# Timestamps are stored as UTC DATETIME(6) and exchanged as aware datetimes
+_CONVERSIONS: Dict[Any, Any] = {
+    **pymysql.converters.conversions,
+    datetime: _escape_utc_datetime,
+    FIELD_TYPE.DATETIME: _convert_utc_datetime,
+}
+
+_POOLS: Dict[Tuple[str, int, str, str], "queue.LifoQueue[Connection]"] = {}
+# Attribute holding the key of the pool a connection was acquired from
+_POOL_KEY_ATTR = "_endolla_pool_key"
+_POOLS_LOCK = threading.Lock()
+
+# Databases whose schema this process has already checked and migrated
+_SCHEMA_READY: set[Tuple[str, int, str]] = set()
+_SCHEMA_LOCK = threading.Lock()
+
 
 @dataclass
 class MySQLConfig:
@@ -78,16 +182,56 @@ SCHEMA_STATEMENTS: Sequence[str] = (
     """,
     """
     CREATE TABLE IF NOT EXISTS port_status (
-        id BIGINT AUTO_INCREMENT PRIMARY KEY,
-        ts VARCHAR(64) NOT NULL,
+        id BIGINT AUTO_INCREMENT,
+        ts DATETIME(6) NOT NULL,
         location_id VARCHAR(64) NULL,
         station_id VARCHAR(64) NULL,
         port_id VARCHAR(64) NULL,
-        status VARCHAR(32) NULL,
+        status TINYINT UNSIGNED NOT NULL,
         last_updated VARCHAR(64) NULL,
-        INDEX idx_port_ts (location_id, station_id, port_id, ts),
+        PRIMARY KEY (id, ts),
+        INDEX idx_port_ts_status (location_id, station_id, port_id, ts, status),
         INDEX idx_ts (ts)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    PARTITION BY RANGE (TO_DAYS(ts)) (PARTITION pmax VALUES LESS THAN MAXVALUE)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS port_latest_status (
+        location_id VARCHAR(64) NOT NULL,
+        station_id VARCHAR(64) NOT NULL,
+        port_id VARCHAR(64) NOT NULL,
+        ts DATETIME(6) NOT NULL,
+        status TINYINT UNSIGNED NOT NULL,
+        last_updated VARCHAR(64) NULL,
+        PRIMARY KEY (location_id, station_id, port_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+        task VARCHAR(32) PRIMARY KEY,
+        last_run DATETIME(6) NOT NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS status_codes (
+        code TINYINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+        status VARCHAR(32) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+        UNIQUE KEY uniq_status (status)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS port_sessions (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        location_id VARCHAR(64) NULL,
+        station_id VARCHAR(64) NULL,
+        port_id VARCHAR(64) NULL,
+        start_ts DATETIME(6) NOT NULL,
+        end_ts DATETIME(6) NULL,
+        duration_min DOUBLE NULL,
+        INDEX idx_port_start (location_id, station_id, port_id, start_ts),
+        INDEX idx_start (start_ts),
+        INDEX idx_end (end_ts)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
     """,
     """
     CREATE TABLE IF NOT EXISTS station_fingerprint_heatmap (
@@ -120,7 +264,31 @@ SCHEMA_STATEMENTS: Sequence[str] = (
     """,
 )
 
-CURRENT_SCHEMA_VERSION = 2
+CURRENT_SCHEMA_VERSION = 9
+
+# port_status is range partitioned by calendar month (UTC) so queries bounded
+# on ts only read the partitions they need. ``pmax`` catches everything past
+# the newest monthly partition and is split ahead of time.
+PARTITION_MAXVALUE = "pmax"
+PARTITION_MONTHS_AHEAD = 1
+
+
+@lru_cache(maxsize=1)
+def _local_tz(hour: int) -> tzinfo:
+    """Return the local UTC offset in effect during epoch ``hour``."""
+
+    return datetime.fromtimestamp(hour * 3600).astimezone().tzinfo
+
+
+def _local_now() -> datetime:
+    """Return the current local time like ``datetime.now().astimezone()``.
+
+    The offset is resolved once per hour instead of on every call, so DST
+    changes are still picked up.
+    """
+
+    now = time.time()
+    return datetime.fromtimestamp(now, _local_tz(int(now // 3600)))
 
 
 @contextmanager
@@ -132,20 +300,350 @@ def _with_cursor(conn: Connection) -> Iterator[pymysql.cursors.Cursor]:
         cursor.close()
 
 
+@contextmanager
+def _with_stream_cursor(conn: Connection) -> Iterator[pymysql.cursors.SSCursor]:
+    """Yield an unbuffered cursor that streams rows from the server.
+
+    The result set must be consumed before the connection is used again.
+    """
+
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+def _column_type(conn: Connection, table: str, column: str) -> str | None:
+    with _with_cursor(conn) as cur:
+        cur.execute(
+            """
+            SELECT DATA_TYPE FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+            """,
+            (table, column),
+        )
+        row = cur.fetchone()
+    return str(row[0]).lower() if row else None
+
+
+def _migrate_ts_to_datetime(conn: Connection) -> None:
+    """Convert ``port_status.ts`` from ISO strings to UTC ``DATETIME(6)``."""
+
+    if _column_type(conn, "port_status", "ts") != "varchar":
+        return
+    logger.info("Converting port_status.ts to DATETIME(6); this may take a while")
+    with _with_cursor(conn) as cur:
+        dropped = cur.execute(
+            "DELETE FROM port_status WHERE ts NOT REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}[T ][0-9]{2}:[0-9]{2}'"
+        )
+        conn.commit()
+        if dropped:
+            logger.warning("Dropped %d port_status rows with malformed timestamps", dropped)
+        cur.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), -1) FROM port_status")
+        first_id, last_id = cur.fetchone()
+        # Rewrite each value as a UTC 'YYYY-MM-DD HH:MM:SS.ffffff' string in
+        # batches, so the final MODIFY is a plain string to DATETIME cast.
+        for start in range(int(first_id), int(last_id) + 1, MIGRATION_BATCH_SIZE):
+            cur.execute(
+                """
+                UPDATE port_status
+                SET ts = DATE_FORMAT(
+                    CASE
+                        WHEN ts REGEXP '[+-][0-9]{2}:[0-9]{2}$' THEN CONVERT_TZ(
+                            CAST(REPLACE(LEFT(ts, CHAR_LENGTH(ts) - 6), 'T', ' ') AS DATETIME(6)),
+                            RIGHT(ts, 6),
+                            '+00:00'
+                        )
+                        WHEN ts LIKE '%%Z' THEN
+                            CAST(REPLACE(LEFT(ts, CHAR_LENGTH(ts) - 1), 'T', ' ') AS DATETIME(6))
+                        ELSE CAST(REPLACE(ts, 'T', ' ') AS DATETIME(6))
+                    END,
+                    '%%Y-%%m-%%d %%H:%%i:%%s.%%f'
+                )
+                WHERE id >= %s AND id < %s
+                """,
+                (start, start + MIGRATION_BATCH_SIZE),
+            )
+            conn.commit()
+        cur.execute("ALTER TABLE port_status MODIFY ts DATETIME(6) NOT NULL")
+
+
+def _index_exists(conn: Connection, table: str, index: str) -> bool:
+    with _with_cursor(conn) as cur:
+        cur.execute(
+            """
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+            LIMIT 1
+            """,
+            (table, index),
+        )
+        return cur.fetchone() is not None
+
+
+def _migrate_covering_port_index(conn: Connection) -> None:
+    """Replace ``idx_port_ts`` with an index that also covers ``status``.
+
+    History reads only need ``ts`` and ``status`` per port, so they can be
+    answered from the index without touching the clustered rows.
+    """
+
+    with _with_cursor(conn) as cur:
+        if not _index_exists(conn, "port_status", "idx_port_ts_status"):
+            cur.execute(
+                "CREATE INDEX idx_port_ts_status "
+                "ON port_status (location_id, station_id, port_id, ts, status)"
+            )
+        if _index_exists(conn, "port_status", "idx_port_ts"):
+            cur.execute("DROP INDEX idx_port_ts ON port_status")
+
+
+def _month_start(ts: datetime) -> datetime:
+    return ts.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month: datetime) -> datetime:
+    return _month_start(month.replace(day=28) + timedelta(days=4))
+
+
+def _partition_definitions(first: datetime, last: datetime) -> List[str]:
+    """Return monthly partition clauses covering ``first`` through ``last``."""
+
+    definitions: List[str] = []
+    month = _month_start(first)
+    while month <= last:
+        upper = _next_month(month)
+        definitions.append(
+            f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{upper:%Y-%m-%d}'))"
+        )
+        month = upper
+    return definitions
+
+
+def _partition_horizon(now: datetime) -> datetime:
+    """Return the last month that should already have its own partition."""
+
+    month = _month_start(now.astimezone(timezone.utc))
+    for _ in range(PARTITION_MONTHS_AHEAD):
+        month = _next_month(month)
+    return month
+
+
+def _partition_names(conn: Connection) -> List[str]:
+    with _with_cursor(conn) as cur:
+        cur.execute(
+            """
+            SELECT partition_name FROM information_schema.partitions
+            WHERE table_schema = DATABASE() AND table_name = 'port_status'
+              AND partition_name IS NOT NULL
+            ORDER BY partition_ordinal_position
+            """
+        )
+        return [str(row[0]) for row in cur.fetchall()]
+
+
+def _ensure_partitions(conn: Connection, now: datetime | None = None) -> None:
+    """Split ``pmax`` so monthly partitions exist a month ahead of ``now``."""
+
+    names = _partition_names(conn)
+    if PARTITION_MAXVALUE not in names:
+        return
+    if now is None:
+        now = datetime.now(timezone.utc)
+    target = _partition_horizon(now)
+    months = [
+        datetime.strptime(name[1:], "%Y%m").replace(tzinfo=timezone.utc)
+        for name in names
+        if name != PARTITION_MAXVALUE
+    ]
+    first = _next_month(max(months)) if months else _month_start(now.astimezone(timezone.utc))
+    definitions = _partition_definitions(first, target)
+    if not definitions:
+        return
+    logger.info("Adding port_status partitions up to %s", f"{target:%Y-%m}")
+    definitions.append(f"PARTITION {PARTITION_MAXVALUE} VALUES LESS THAN MAXVALUE")
+    with _with_cursor(conn) as cur:
+        cur.execute(
+            f"ALTER TABLE port_status REORGANIZE PARTITION {PARTITION_MAXVALUE} "
+            f"INTO ({', '.join(definitions)})"
+        )
+
+
+def _migrate_partition_by_month(conn: Connection) -> None:
+    """Range partition ``port_status`` by month of ``ts``.
+
+    MySQL requires the partitioning column in every unique key, so the primary
+    key becomes ``(id, ts)`` first. Existing rows are spread over one
+    partition per month from the oldest snapshot onwards.
+    """
+
+    if _partition_names(conn):
+        return
+    logger.info("Partitioning port_status by month; this may take a while")
+    with _with_cursor(conn) as cur:
+        cur.execute(
+            """
+            SELECT 1 FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'port_status'
+              AND index_name = 'PRIMARY' AND column_name = 'ts'
+            """
+        )
+        if cur.fetchone() is None:
+            cur.execute("ALTER TABLE port_status DROP PRIMARY KEY, ADD PRIMARY KEY (id, ts)")
+        cur.execute("SELECT MIN(ts) FROM port_status")
+        now = datetime.now(timezone.utc)
+        first = cur.fetchone()[0] or now
+        definitions = _partition_definitions(first, _partition_horizon(now))
+        definitions.append(f"PARTITION {PARTITION_MAXVALUE} VALUES LESS THAN MAXVALUE")
+        cur.execute(
+            "ALTER TABLE port_status PARTITION BY RANGE (TO_DAYS(ts)) "
+            f"({', '.join(definitions)})"
+        )
+
+
+def _release_other_status_code(conn: Connection) -> None:
+    """Drop any status registered under the reserved fallback code."""
+
+    with _with_cursor(conn) as cur:
+        cur.execute("DELETE FROM status_codes WHERE code >= %s", (OTHER_STATUS_CODE,))
+    conn.commit()
+
+
+def _migrate_status_codes(conn: Connection) -> None:
+    """Store ``port_status.status`` as a ``status_codes`` reference.
+
+    Known statuses keep their :data:`STATUS_CODES` value, other stored
+    statuses get a new code and missing ones become ``MISSING_STATUS_CODE``.
+    """
+
+    with _with_cursor(conn) as cur:
+        cur.executemany(
+            "INSERT IGNORE INTO status_codes (code, status) VALUES (%s, %s)",
+            [(code, status) for status, code in STATUS_CODES.items() if status is not None],
+        )
+        conn.commit()
+        if _column_type(conn, "port_status", "status") != "varchar":
+            return
+        logger.info("Converting port_status.status to status codes; this may take a while")
+        cur.execute(
+            """
+            INSERT IGNORE INTO status_codes (status)
+            SELECT DISTINCT status FROM port_status WHERE status IS NOT NULL
+            """
+        )
+        conn.commit()
+        _release_other_status_code(conn)
+        cur.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), -1) FROM port_status")
+        first_id, last_id = cur.fetchone()
+        # Rows already holding a numeric code are skipped so an interrupted
+        # conversion can safely run again.
+        for start in range(int(first_id), int(last_id) + 1, MIGRATION_BATCH_SIZE):
+            cur.execute(
+                """
+                UPDATE port_status ps
+                LEFT JOIN status_codes sc ON sc.status = ps.status COLLATE utf8mb4_bin
+                SET ps.status = CASE
+                    WHEN ps.status IS NULL THEN %s
+                    ELSE COALESCE(sc.code, %s)
+                END
+                WHERE ps.id >= %s AND ps.id < %s
+                  AND (ps.status IS NULL OR ps.status NOT REGEXP '^[0-9]+$')
+                """,
+                (MISSING_STATUS_CODE, OTHER_STATUS_CODE, start, start + MIGRATION_BATCH_SIZE),
+            )
+            conn.commit()
+        cur.execute("ALTER TABLE port_status MODIFY status TINYINT UNSIGNED NOT NULL")
+
+
+def backfill_port_sessions(conn: Connection) -> None:
+    """Fill an empty ``port_sessions`` from the ``port_status`` history."""
+
+    # History is read back as status codes
+    _migrate_status_codes(conn)
+    with _with_cursor(conn) as cur:
+        cur.execute("SELECT 1 FROM port_sessions LIMIT 1")
+        if cur.fetchone() is not None:
+            return
+    rows: List[Tuple[Any, ...]] = []
+    for (loc, sta, port), events in _all_history(conn).items():
+        for start, end, duration in _session_records(events):
+            rows.append((loc, sta, port, start, end, duration))
+        open_start = _open_session_start(events)
+        if open_start is not None:
+            rows.append((loc, sta, port, open_start, None, None))
+    if rows:
+        logger.info("Backfilling %d port sessions", len(rows))
+        _bulk_insert(conn, "port_sessions", SESSION_COLUMNS, rows)
+    conn.commit()
+
+
+def backfill_latest_status(conn: Connection) -> None:
+    """Fill an empty ``port_latest_status`` from the newest ``port_status`` rows."""
+
+    with _with_cursor(conn) as cur:
+        cur.execute("SELECT 1 FROM port_latest_status LIMIT 1")
+        if cur.fetchone() is not None:
+            return
+        cur.execute(
+            """
+            INSERT IGNORE INTO port_latest_status
+                (location_id, station_id, port_id, ts, status, last_updated)
+            SELECT
+                COALESCE(ps.location_id, ''),
+                COALESCE(ps.station_id, ''),
+                COALESCE(ps.port_id, ''),
+                ps.ts,
+                ps.status,
+                ps.last_updated
+            FROM port_status ps
+            JOIN (
+                SELECT location_id, station_id, port_id, MAX(ts) AS max_ts
+                FROM port_status
+                GROUP BY location_id, station_id, port_id
+            ) latest
+            ON ps.location_id <=> latest.location_id
+            AND ps.station_id <=> latest.station_id
+            AND ps.port_id <=> latest.port_id
+            AND ps.ts = latest.max_ts
+            """
+        )
+    conn.commit()
+
+
+# Schema upgrades keyed by the version they bring the database to. Each one
+# must be safe to run against a database that already has the change.
+MIGRATIONS: Sequence[Tuple[int, Callable[[Connection], None]]] = (
+    (3, _migrate_ts_to_datetime),
+    (4, _migrate_covering_port_index),
+    (5, _migrate_partition_by_month),
+    (6, backfill_port_sessions),
+    (7, _migrate_status_codes),
+    (8, backfill_latest_status),
+    (9, _release_other_status_code),
+)
+
+
 def _ensure_schema(conn: Connection) -> None:
-    for statement in SCHEMA_STATEMENTS:
-        with _with_cursor(conn) as cur:
-            cur.execute(statement)
     with _with_cursor(conn) as cur:
+        for statement in SCHEMA_STATEMENTS:
+            cur.execute(statement)
         cur.execute("SELECT version FROM schema_version WHERE id = 1")
         row = cur.fetchone()
+    version = int(row[0]) if row is not None else 0
+    for target, migration in MIGRATIONS:
+        if version < target:
+            migration(conn)
+    # A fresh table only has pmax; split it now rather than at the first prune
+    _ensure_partitions(conn)
+    with _with_cursor(conn) as cur:
         if row is None:
             cur.execute(
                 "INSERT INTO schema_version (id, version) VALUES (1, %s)",
                 (CURRENT_SCHEMA_VERSION,),
             )
             conn.commit()
-        elif row[0] != CURRENT_SCHEMA_VERSION:
+        elif version != CURRENT_SCHEMA_VERSION:
             cur.execute(
                 "UPDATE schema_version SET version = %s WHERE id = 1",
                 (CURRENT_SCHEMA_VERSION,),
@@ -173,28 +671,23 @@ def _downsample_range(
         "FROM port_status",
         "WHERE 1 = 1",
     ]
-    params: List[str] = []
+    params: List[datetime] = []
     if newer_than is not None:
         query.append("AND ts >= %s")
-        params.append(newer_than.isoformat())
+        params.append(newer_than)
     if older_than is not None:
         query.append("AND ts < %s")
-        params.append(older_than.isoformat())
+        params.append(older_than)
     query.append("ORDER BY location_id, station_id, port_id, ts")
     sql = " ".join(query)
 
     seen: Dict[Tuple[PortKey, Any], int] = {}
     to_delete: List[int] = []
-    with _with_cursor(conn) as cur:
+    with _with_stream_cursor(conn) as cur:
         cur.execute(sql, params)
-        for row in cur.fetchall():
-            row_id, loc, sta, port, ts_str = row
-            try:
-                ts = datetime.fromisoformat(ts_str)
-            except (TypeError, ValueError):
-                logger.debug("Unable to parse timestamp '%s' for row %s", ts_str, row_id)
-                continue
-            key = ((loc, sta, port), bucket(ts))
+        for row_id, loc, sta, port, ts in cur:
+            # Bucket by local calendar hours and days, as before UTC storage
+            key = ((loc, sta, port), bucket(ts.astimezone()))
             if key in seen:
                 to_delete.append(row_id)
             else:
@@ -202,54 +695,146 @@ def _downsample_range(
     return to_delete
 
 
-def _delete_rows(conn: Connection, row_ids: Sequence[int], chunk_size: int = 1000) -> None:
+def _delete_rows(
+    conn: Connection,
+    row_ids: Sequence[int],
+    chunk_size: int = 1000,
+    *,
+    newer_than: datetime | None = None,
+    older_than: datetime | None = None,
+) -> None:
+    """Delete ``row_ids`` committing after every chunk.
+
+    Committing per chunk keeps each transaction's locks and undo log small
+    when a long backfill leaves many rows to downsample. The optional ``ts``
+    bounds let MySQL skip partitions that cannot hold any of the rows.
+    """
+
     if not row_ids:
         return
+    bounds = ""
+    bound_params: List[datetime] = []
+    if newer_than is not None:
+        bounds += " AND ts >= %s"
+        bound_params.append(newer_than)
+    if older_than is not None:
+        bounds += " AND ts < %s"
+        bound_params.append(older_than)
     with _with_cursor(conn) as cur:
         for start in range(0, len(row_ids), chunk_size):
             chunk = row_ids[start : start + chunk_size]
             placeholders = ", ".join(["%s"] * len(chunk))
             cur.execute(
-                f"DELETE FROM port_status WHERE id IN ({placeholders})",
-                tuple(chunk),
+                f"DELETE FROM port_status WHERE id IN ({placeholders}){bounds}",
+                (*chunk, *bound_params),
             )
+            conn.commit()
 
 
-def prune_old_data(conn: Connection) -> None:
-    now = datetime.now().astimezone()
+def prune_old_data(conn: Connection, *, now: datetime | None = None) -> None:
+    if now is None:
+        now = _local_now()
     high_detail_cutoff = now - timedelta(days=HIGH_DETAIL_DAYS)
     medium_detail_cutoff = now - timedelta(days=MEDIUM_DETAIL_DAYS)
 
-    to_delete: List[int] = []
+    _ensure_partitions(conn, now)
+
     # Keep at most one record per day for very old data (low detail)
-    to_delete.extend(
-        _downsample_range(
-            conn,
-            bucket=_truncate_to_day,
-            older_than=medium_detail_cutoff,
-        )
+    low_detail = _downsample_range(
+        conn,
+        bucket=_truncate_to_day,
+        older_than=medium_detail_cutoff,
     )
+    _delete_rows(conn, low_detail, older_than=medium_detail_cutoff)
     # Keep at most one record per hour for medium-aged data
-    to_delete.extend(
-        _downsample_range(
-            conn,
-            bucket=_truncate_to_hour,
-            newer_than=medium_detail_cutoff,
-            older_than=high_detail_cutoff,
+    medium_detail = _downsample_range(
+        conn,
+        bucket=_truncate_to_hour,
+        newer_than=medium_detail_cutoff,
+        older_than=high_detail_cutoff,
+    )
+    _delete_rows(
+        conn,
+        medium_detail,
+        newer_than=medium_detail_cutoff,
+        older_than=high_detail_cutoff,
+    )
+
+    pruned = len(low_detail) + len(medium_detail)
+    if pruned:
+        logger.debug("Pruned %d historical rows", pruned)
+    conn.commit()
+
+
+def _run_if_due(
+    conn: Connection,
+    task: str,
+    interval: timedelta,
+    action: Callable[[Connection], None],
+    now: datetime | None,
+) -> bool:
+    """Run ``action`` if ``interval`` has passed since ``task`` last ran.
+
+    The last run is recorded in ``maintenance_runs``, so the interval holds
+    across restarts and between processes sharing the database.
+    """
+
+    if now is None:
+        now = _local_now()
+    with _with_cursor(conn) as cur:
+        cur.execute("SELECT last_run FROM maintenance_runs WHERE task = %s", (task,))
+        row = cur.fetchone()
+    conn.commit()
+    if row is not None and now - row[0] < interval:
+        return False
+    action(conn)
+    with _with_cursor(conn) as cur:
+        cur.execute(
+            """
+            INSERT INTO maintenance_runs (task, last_run) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE last_run = VALUES(last_run)
+            """,
+            (task, now),
         )
+    conn.commit()
+    return True
+
+
+def maybe_prune(conn: Connection, *, now: datetime | None = None) -> bool:
+    """Run :func:`prune_old_data` if ``PRUNE_INTERVAL`` has passed since the last run.
+
+    Returns whether it pruned.
+    """
+
+    if now is None:
+        now = _local_now()
+    return _run_if_due(
+        conn, "prune", PRUNE_INTERVAL, lambda c: prune_old_data(c, now=now), now
     )
 
-    if to_delete:
-        _delete_rows(conn, to_delete)
-        logger.debug("Pruned %d historical rows", len(to_delete))
+
+def analyze_tables(conn: Connection) -> None:
+    """Refresh InnoDB index statistics so the optimizer's choices stay current."""
+
+    with _with_cursor(conn) as cur:
+        cur.execute(f"ANALYZE TABLE {', '.join(ANALYZED_TABLES)}")
+        cur.fetchall()
     conn.commit()
 
 
+def maybe_analyze(conn: Connection, *, now: datetime | None = None) -> bool:
+    """Run :func:`analyze_tables` if ``ANALYZE_INTERVAL`` has passed since the last run.
+
+    Returns whether it analysed.
+    """
+
+    return _run_if_due(conn, "analyze", ANALYZE_INTERVAL, analyze_tables, now)
+
+
 def connect(config: MySQLConfig | str | None = None) -> Connection:
-    if config is None:
-        config = MySQLConfig.from_env()
-    if isinstance(config, str):
-        config = MySQLConfig.from_url(config)
+    """Open a connection, creating and migrating the schema once per process."""
+
+    config = _resolve_config(config)
     conn = pymysql.connect(
         host=config.host,
         port=config.port,
@@ -259,38 +844,119 @@ def connect(config: MySQLConfig | str | None = None) -> Connection:
         autocommit=False,
         charset="utf8mb4",
         cursorclass=pymysql.cursors.Cursor,
+        conv=_CONVERSIONS,
+        init_command="SET time_zone = '+00:00'",
     )
-    _ensure_schema(conn)
-    prune_old_data(conn)
+    key = (config.host, config.port, config.database)
+    with _SCHEMA_LOCK:
+        if key not in _SCHEMA_READY:
+            _ensure_schema(conn)
+            _SCHEMA_READY.add(key)
     return conn
 
 
+def _resolve_config(config: MySQLConfig | str | None) -> MySQLConfig:
+    if config is None:
+        return MySQLConfig.from_env()
+    if isinstance(config, str):
+        return MySQLConfig.from_url(config)
+    return config
+
+
+def _pool_for(key: Tuple[str, int, str, str]) -> "queue.LifoQueue[Connection]":
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = queue.LifoQueue(maxsize=POOL_SIZE)
+        return pool
+
+
+def acquire(config: MySQLConfig | str | None = None) -> Connection:
+    """Return an idle pooled connection, opening a new one when none is left.
+
+    Only new connections go through :func:`connect`; reused connections are
+    just pinged. Hand the connection back with :func:`release`.
+    """
+
+    config = _resolve_config(config)
+    key = (config.host, config.port, config.user, config.database)
+    pool = _pool_for(key)
+    while True:
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = connect(config)
+            # PyMySQL stores user and database as bytes, so the key is kept
+            # on the connection instead of being rebuilt from its attributes
+            setattr(conn, _POOL_KEY_ATTR, key)
+            return conn
+        try:
+            conn.ping(reconnect=True)
+        except pymysql.err.Error:
+            logger.debug("Discarding stale pooled MySQL connection", exc_info=True)
+            _close_quietly(conn)
+            continue
+        return conn
+
+
+def release(conn: Connection) -> None:
+    """Return ``conn`` to the pool it was acquired from.
+
+    The connection is closed instead if the pool is already full or if it
+    did not come from :func:`acquire`.
+    """
+
+    key = getattr(conn, _POOL_KEY_ATTR, None)
+    if key is None:
+        _close_quietly(conn)
+        return
+    try:
+        conn.rollback()
+    except pymysql.err.Error:
+        _close_quietly(conn)
+        return
+    pool = _pool_for(key)
+    try:
+        pool.put_nowait(conn)
+    except queue.Full:
+        _close_quietly(conn)
+
+
+@contextmanager
+def pooled(config: MySQLConfig | str | None = None) -> Iterator[Connection]:
+    """Borrow a pooled connection for the duration of a ``with`` block."""
+
+    conn = acquire(config)
+    try:
+        yield conn
+    finally:
+        release(conn)
+
+
+def _close_quietly(conn: Connection) -> None:
+    try:
+        conn.close()
+    except pymysql.err.Error:
+        pass
+
+
 def db_stats(conn: Connection) -> Dict[str, int]:
-    with _with_cursor(conn) as cur:
-        cur.execute("SELECT COUNT(*) FROM port_status")
-        rows = int(cur.fetchone()[0])
-    with _with_cursor(conn) as cur:
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(data_length + index_length), 0)
-            FROM information_schema.tables
-            WHERE table_schema = DATABASE() AND table_name = 'port_status'
-            """
-        )
-        size_bytes = int(cur.fetchone()[0] or 0)
     with _with_cursor(conn) as cur:
         cur.execute(
             """
-            SELECT COALESCE(SUM(data_free), 0)
+            SELECT
+                (SELECT COUNT(*) FROM port_status),
+                COALESCE(SUM(data_length + index_length), 0),
+                COALESCE(SUM(data_free), 0)
             FROM information_schema.tables
             WHERE table_schema = DATABASE() AND table_name = 'port_status'
             """
         )
-        free_bytes = int(cur.fetchone()[0] or 0)
+        row_count, size_bytes, free_bytes = cur.fetchone()
     stats = {
-        "rows": rows,
-        "size_bytes": size_bytes,
-        "free_bytes": free_bytes,
+        "rows": int(row_count),
+        "size_bytes": int(size_bytes or 0),
+        "free_bytes": int(free_bytes or 0),
     }
     logger.debug("Database stats: %s", stats)
     return stats
@@ -302,118 +968,325 @@ def compress_db(conn: Connection) -> None:
     conn.commit()
 
 
+def _bulk_insert(
+    conn: Connection,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    *,
+    chunk_size: int = INSERT_CHUNK_SIZE,
+    suffix: str = "",
+) -> None:
+    """Insert ``rows`` using multi-row ``INSERT`` statements.
+
+    Each statement carries up to ``chunk_size`` rows, which keeps round trips
+    low while staying far below MySQL's ``max_allowed_packet``. ``rows`` may
+    be a generator; it is consumed one chunk at a time. ``suffix`` is
+    appended to every statement, e.g. an ``ON DUPLICATE KEY UPDATE`` clause.
+    """
+
+    prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    remaining = iter(rows)
+    with _with_cursor(conn) as cur:
+        while True:
+            values = ", ".join(
+                cur.mogrify(placeholder, row) for row in islice(remaining, chunk_size)
+            )
+            if not values:
+                break
+            cur.execute(prefix + values + suffix)
+
+
+def resolve_status_codes(
+    conn: Connection, statuses: Iterable[str | None]
+) -> Dict[str | None, int]:
+    """Return the stored code for every status, registering unseen ones.
+
+    Statuses that cannot get a code below :data:`OTHER_STATUS_CODE` are left
+    out, so callers fall back to that code.
+    """
+
+    codes: Dict[str | None, int] = {None: MISSING_STATUS_CODE}
+    with _with_cursor(conn) as cur:
+        cur.execute("SELECT status, code FROM status_codes")
+        codes.update(cur.fetchall())
+        unseen = sorted({status for status in statuses if status not in codes})
+        if unseen:
+            cur.executemany("INSERT IGNORE INTO status_codes (status) VALUES (%s)", unseen)
+            # Once the counter is exhausted it keeps handing out the fallback
+            # code; the row is removed before anything else can see it.
+            cur.execute("DELETE FROM status_codes WHERE code >= %s", (OTHER_STATUS_CODE,))
+            cur.execute("SELECT status, code FROM status_codes")
+            codes.update(cur.fetchall())
+    return codes
+
+
+# Fields read from each parsed port record, in port_status column order.
+RECORD_FIELDS = ("location_id", "station_id", "port_id", "status", "last_updated")
+
+SESSION_COLUMNS = ("location_id", "station_id", "port_id", "start_ts", "end_ts", "duration_min")
+
+
+def _record_sessions(
+    conn: Connection,
+    started: Sequence[Tuple[Any, Any, Any]],
+    ended: Sequence[Tuple[Any, Any, Any]],
+    ts: datetime,
+) -> None:
+    """Open ``port_sessions`` rows for ``started`` ports and close ``ended`` ones."""
+
+    if ended:
+        with _with_cursor(conn) as cur:
+            # Every port that finished a session is closed by one statement.
+            # The inlined ids are escaped again for the final interpolation.
+            ports = " UNION ALL ".join(
+                cur.mogrify("SELECT %s AS location_id, %s AS station_id, %s AS port_id", port)
+                for port in ended
+            ).replace("%", "%%")
+            cur.execute(
+                f"""
+                UPDATE port_sessions ps
+                JOIN ({ports}) ended
+                  ON ps.location_id <=> ended.location_id
+                 AND ps.station_id <=> ended.station_id
+                 AND ps.port_id <=> ended.port_id
+                SET ps.end_ts = %s,
+                    ps.duration_min = TIMESTAMPDIFF(MICROSECOND, ps.start_ts, %s) / 60000000
+                WHERE ps.end_ts IS NULL
+                """,
+                (ts, ts),
+            )
+    if started:
+        _bulk_insert(
+            conn,
+            "port_sessions",
+            SESSION_COLUMNS,
+            [(loc, sta, port, ts, None, None) for loc, sta, port in started],
+        )
+
+
 def save_snapshot(
     conn: Connection,
     records: Iterable[Dict[str, Any]],
     ts: datetime | None = None,
 ) -> bool:
     if ts is None:
-        ts = datetime.now().astimezone()
-    ts_iso = ts.isoformat()
-    new_rows: List[Tuple[str, str | None, str | None, str | None, str | None, str | None]] = []
+        ts = _local_now()
+    records = list(records)
+    latest = _latest_status_map(conn)
+    codes = resolve_status_codes(conn, (r.get("status") for r in records))
+    new_rows: List[Tuple[datetime, str | None, str | None, str | None, int, str | None]] = []
+    started: List[Tuple[Any, Any, Any]] = []
+    ended: List[Tuple[Any, Any, Any]] = []
     for r in records:
-        loc = r.get("location_id")
-        sta = r.get("station_id")
-        port = r.get("port_id")
-        status = r.get("status")
-        with _with_cursor(conn) as cur:
-            cur.execute(
-                """
-                SELECT status FROM port_status
-                WHERE location_id <=> %s AND station_id <=> %s AND port_id <=> %s
-                ORDER BY ts DESC LIMIT 1
-                """,
-                (loc, sta, port),
-            )
-            row = cur.fetchone()
-        if row and row[0] == status:
+        loc, sta, port, raw_status, last_updated = map(r.get, RECORD_FIELDS)
+        status = codes.get(raw_status, OTHER_STATUS_CODE)
+        # Identifiers come back from MySQL as strings whatever type the feed used
+        key = tuple(None if part is None else str(part) for part in (loc, sta, port))
+        previous = latest.get(key)
+        if key in latest and previous == status:
             continue
-        new_rows.append(
+        if status == IN_USE_CODE:
+            started.append((loc, sta, port))
+        elif previous == IN_USE_CODE:
+            ended.append((loc, sta, port))
+        new_rows.append((ts, loc, sta, port, status, last_updated))
+    if not new_rows:
+        return False
+    # All writes for a snapshot land in one transaction with a single commit
+    try:
+        _bulk_insert(
+            conn,
+            "port_status",
+            ("ts", "location_id", "station_id", "port_id", "status", "last_updated"),
+            new_rows,
+        )
+        _bulk_insert(
+            conn,
+            "port_latest_status",
+            ("ts", "location_id", "station_id", "port_id", "status", "last_updated"),
             (
-                ts_iso,
-                loc,
-                sta,
-                port,
-                status,
-                r.get("last_updated"),
-            )
+                (ts, *("" if part is None else part for part in (loc, sta, port)), status, last)
+                for ts, loc, sta, port, status, last in new_rows
+            ),
+            # Older snapshots (backfills, out-of-order writes) must not move a
+            # port's latest status back in time. MySQL applies the assignments
+            # left to right, so ts is updated last.
+            suffix=(
+                " ON DUPLICATE KEY UPDATE"
+                " status = IF(VALUES(ts) >= ts, VALUES(status), status),"
+                " last_updated = IF(VALUES(ts) >= ts, VALUES(last_updated), last_updated),"
+                " ts = GREATEST(ts, VALUES(ts))"
+            ),
         )
-    if new_rows:
-        with _with_cursor(conn) as cur:
-            cur.executemany(
-                """
-                INSERT INTO port_status (ts, location_id, station_id, port_id, status, last_updated)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """,
-                new_rows,
-            )
-        conn.commit()
-    prune_old_data(conn)
-    return bool(new_rows)
+        _record_sessions(conn, started, ended, ts)
+    except pymysql.err.Error:
+        conn.rollback()
+        raise
+    conn.commit()
+    return True
 
 
-def _session_durations(
-    statuses: List[Tuple[datetime, str]],
-    *,
-    now: datetime | None = None,
-) -> List[float]:
-    if now is None:
-        now = datetime.now().astimezone()
-    sessions: List[float] = []
-    start: datetime | None = None
-    for ts, status in statuses:
-        if status == "IN_USE":
-            if start is None:
-                start = ts
+def _group_status_rows(
+    rows: Iterable[Sequence[Any]], key: Callable[[Sequence[Any]], Any]
+) -> Dict[Any, List[Tuple[datetime, int]]]:
+    """Group ``(..., ts, status)`` rows ordered by port into event lists."""
+
+    history: Dict[Any, List[Tuple[datetime, int]]] = {}
+    event = itemgetter(-2, -1)
+    for port_key, group in groupby(rows, key=key):
+        history.setdefault(port_key, []).extend(map(event, group))
+    return history
+
+
+def _session_count(statuses: List[Tuple[datetime, int]]) -> int:
+    """Return how many ``IN_USE`` runs, open or closed, ``statuses`` contains."""
+
+    count = 0
+    in_session = False
+    in_use = IN_USE_CODE
+    for _, status in statuses:
+        if status == in_use:
+            if not in_session:
+                count += 1
+                in_session = True
         else:
-            if start is not None:
-                sessions.append((ts - start).total_seconds() / 60)
-                start = None
-    if start is not None:
-        sessions.append((now - start).total_seconds() / 60)
-    return sessions
+            in_session = False
+    return count
 
 
 def _session_records(
-    statuses: List[Tuple[datetime, str]]
+    statuses: List[Tuple[datetime, int]]
 ) -> List[Tuple[datetime, datetime, float]]:
     sessions: List[Tuple[datetime, datetime, float]] = []
+    append = sessions.append
+    in_use = IN_USE_CODE
     start: datetime | None = None
     for ts, status in statuses:
-        if status == "IN_USE":
+        if status == in_use:
             if start is None:
                 start = ts
-        else:
-            if start is not None:
-                dur = (ts - start).total_seconds() / 60
-                sessions.append((start, ts, dur))
-                start = None
+        elif start is not None:
+            append((start, ts, (ts - start).total_seconds() / 60))
+            start = None
     return sessions
 
 
+def _open_session_start(statuses: List[Tuple[datetime, int]]) -> datetime | None:
+    """Return when the trailing, still open ``IN_USE`` run began, if any."""
+
+    start: datetime | None = None
+    for ts, status in reversed(statuses):
+        if status != IN_USE_CODE:
+            break
+        start = ts
+    return start
+
+
+# History queries are fixed strings so no SQL is assembled per call
+_ALL_HISTORY_QUERY = """
+    SELECT location_id, station_id, port_id, ts, status
+    FROM port_status
+    ORDER BY location_id, station_id, port_id, ts
+"""
+_RECENT_HISTORY_QUERY = """
+    SELECT location_id, station_id, port_id, ts, status
+    FROM port_status
+    WHERE ts >= %s
+    ORDER BY location_id, station_id, port_id, ts
+"""
+_RECENT_HISTORY_UNTIL_QUERY = """
+    SELECT location_id, station_id, port_id, ts, status
+    FROM port_status
+    WHERE ts >= %s AND ts <= %s
+    ORDER BY location_id, station_id, port_id, ts
+"""
+_LOCATION_HISTORY_QUERY = """
+    SELECT station_id, port_id, ts, status
+    FROM port_status
+    WHERE location_id <=> %s AND ts >= %s
+    ORDER BY station_id, port_id, ts
+"""
+_LOCATION_HISTORY_UNTIL_QUERY = """
+    SELECT station_id, port_id, ts, status
+    FROM port_status
+    WHERE location_id <=> %s AND ts >= %s AND ts <= %s
+    ORDER BY station_id, port_id, ts
+"""
+
+
+def _stream_history(
+    conn: Connection,
+    query: str,
+    params: Sequence[Any],
+    key: Callable[[Sequence[Any]], Any] = itemgetter(0, 1, 2),
+) -> Dict[Any, List[Tuple[datetime, int]]]:
+    """Run a history ``query`` on a streaming cursor and group its rows."""
+
+    with _with_stream_cursor(conn) as cur:
+        cur.execute(query, params)
+        return _group_status_rows(cur, key)
+
+
 def _recent_status_history(
     conn: Connection,
     since: datetime,
     until: datetime | None = None,
-) -> Dict[PortKey, List[Tuple[datetime, str]]]:
-    params: List[Any] = [since.isoformat()]
-    query = [
-        "SELECT location_id, station_id, port_id, ts, status",
-        "FROM port_status",
-        "WHERE ts >= %s",
-    ]
-    if until is not None:
-        query.append("AND ts <= %s")
-        params.append(until.isoformat())
-    query.append("ORDER BY location_id, station_id, port_id, ts")
-    sql = " ".join(query)
-    history: Dict[PortKey, List[Tuple[datetime, str]]] = {}
-    with _with_cursor(conn) as cur:
-        cur.execute(sql, params)
-        for loc, sta, port, ts_str, status in cur.fetchall():
-            key = (loc, sta, port)
-            history.setdefault(key, []).append((datetime.fromisoformat(ts_str), status))
-    return history
+) -> Dict[PortKey, List[Tuple[datetime, int]]]:
+    if until is None:
+        return _stream_history(conn, _RECENT_HISTORY_QUERY, (since,))
+    return _stream_history(conn, _RECENT_HISTORY_UNTIL_QUERY, (since, until))
+
+
+def _rules_lookback(rules: Rules) -> timedelta:
+    """Return how much history before an instant the charger rules look at."""
+
+    return timedelta(
+        days=max(rules.unused_days, rules.long_session_days, rules.unavailable_hours / 24)
+    )
+
+
+def analysis_history(
+    conn: Connection, rules: Rules | None = None, *, now: datetime | None = None
+) -> Dict[PortKey, List[Tuple[datetime, int]]]:
+    """Load the status history shared by the dashboard analyses.
+
+    The result covers the windows of :func:`analyze_chargers`,
+    :func:`stats_from_db` and :func:`timeline_stats`, so one query can feed
+    all three through their ``history`` argument.
+    """
+
+    if rules is None:
+        rules = Rules()
+    if now is None:
+        now = _local_now()
+    lookback = max(
+        timedelta(days=MEDIUM_DETAIL_DAYS),
+        timedelta(days=TIMELINE_DAYS) + _rules_lookback(rules),
+    )
+    return _recent_status_history(conn, now - lookback)
+
+
+def _history_window(
+    history: Dict[PortKey, List[Tuple[datetime, int]]],
+    since: datetime,
+    until: datetime | None = None,
+) -> Dict[PortKey, List[Tuple[datetime, int]]]:
+    """Slice ``history`` to events from ``since`` (through ``until``).
+
+    Events are ordered by ts, so each window is a contiguous slice; ports
+    without events in it are dropped, as the SQL loaders would.
+    """
+
+    window: Dict[PortKey, List[Tuple[datetime, int]]] = {}
+    ts_key = itemgetter(0)
+    for key, events in history.items():
+        lo = bisect_left(events, since, key=ts_key)
+        hi = len(events) if until is None else bisect_right(events, until, lo=lo, key=ts_key)
+        if lo < hi:
+            window[key] = events[lo:hi]
+    return window
 
 
 def _recent_location_history(
@@ -421,81 +1294,73 @@ def _recent_location_history(
     location_id: str | None,
     since: datetime,
     until: datetime | None = None,
-) -> Dict[Tuple[str | None, str | None], List[Tuple[datetime, str]]]:
-    params: List[Any] = [location_id, since.isoformat()]
-    query = [
-        "SELECT station_id, port_id, ts, status",
-        "FROM port_status",
-        "WHERE location_id <=> %s AND ts >= %s",
-    ]
-    if until is not None:
-        query.append("AND ts <= %s")
-        params.append(until.isoformat())
-    query.append("ORDER BY station_id, port_id, ts")
-    sql = " ".join(query)
-    history: Dict[Tuple[str | None, str | None], List[Tuple[datetime, str]]] = {}
-    with _with_cursor(conn) as cur:
-        cur.execute(sql, params)
-        for station_id, port_id, ts_str, status in cur.fetchall():
-            key = (station_id, port_id)
-            history.setdefault(key, []).append((datetime.fromisoformat(ts_str), status))
-    return history
+) -> Dict[Tuple[str | None, str | None], List[Tuple[datetime, int]]]:
+    if until is None:
+        return _stream_history(
+            conn, _LOCATION_HISTORY_QUERY, (location_id, since), itemgetter(0, 1)
+        )
+    return _stream_history(
+        conn, _LOCATION_HISTORY_UNTIL_QUERY, (location_id, since, until), itemgetter(0, 1)
+    )
 
 
 def _distinct_station_ports(
     conn: Connection, location_id: str | None, station_id: str | None
 ) -> List[str | None]:
-    """Return all known ports for a station."""
+    """Return all known ports for a station.
+
+    Every stored port has a row in ``port_latest_status``, so this is a short
+    primary-key range read instead of a scan of the station's whole history.
+    """
 
     with _with_cursor(conn) as cur:
         cur.execute(
             """
-            SELECT DISTINCT port_id
-            FROM port_status
-            WHERE location_id <=> %s AND station_id <=> %s
+            SELECT NULLIF(port_id, '')
+            FROM port_latest_status
+            WHERE location_id = %s AND station_id = %s
             """,
-            (location_id, station_id),
+            ("" if location_id is None else location_id, "" if station_id is None else station_id),
         )
         return [row[0] for row in cur.fetchall()]
 
 
+_STATION_HISTORY_BETWEEN_QUERY = """
+    SELECT port_id, ts, status
+    FROM port_status
+    WHERE location_id <=> %s
+      AND station_id <=> %s
+      AND ts >= %s AND ts < %s
+    ORDER BY port_id, ts
+"""
+
+
 def _station_history_between(
     conn: Connection,
     location_id: str | None,
     station_id: str | None,
     start: datetime,
     end: datetime,
-) -> Dict[str | None, List[Tuple[datetime, str]]]:
+) -> Dict[str | None, List[Tuple[datetime, int]]]:
     """Return status history for a station between ``start`` and ``end``."""
 
-    history: Dict[str | None, List[Tuple[datetime, str]]] = {
+    history: Dict[str | None, List[Tuple[datetime, int]]] = {
         port_id: [] for port_id in _distinct_station_ports(conn, location_id, station_id)
     }
 
-    params = (location_id, station_id, start.isoformat(), end.isoformat())
-    with _with_cursor(conn) as cur:
-        cur.execute(
-            """
-            SELECT port_id, ts, status
-            FROM port_status
-            WHERE location_id <=> %s
-              AND station_id <=> %s
-              AND ts >= %s AND ts < %s
-            ORDER BY port_id, ts
-            """,
-            params,
+    history.update(
+        _stream_history(
+            conn,
+            _STATION_HISTORY_BETWEEN_QUERY,
+            (location_id, station_id, start, end),
+            itemgetter(0),
         )
-        for port_id, ts_str, status in cur.fetchall():
-            try:
-                ts = datetime.fromisoformat(ts_str)
-            except (TypeError, ValueError):
-                continue
-            history.setdefault(port_id, []).append((ts, status))
+    )
 
     if not history:
         return {}
 
-    previous_params = (location_id, station_id, start.isoformat(), location_id, station_id)
+    previous_params = (location_id, station_id, start, location_id, station_id)
     with _with_cursor(conn) as cur:
         cur.execute(
             """
@@ -512,11 +1377,7 @@ def _station_history_between(
             """,
             previous_params,
         )
-        for port_id, ts_str, status in cur.fetchall():
-            try:
-                ts = datetime.fromisoformat(ts_str)
-            except (TypeError, ValueError):
-                continue
+        for port_id, ts, status in cur.fetchall():
             events = history.setdefault(port_id, [])
             if not events or ts < events[0][0]:
                 events.insert(0, (ts, status))
@@ -539,22 +1400,61 @@ def _station_earliest_status(
             (location_id, station_id),
         )
         row = cur.fetchone()
-    if not row or not row[0]:
+    if not row or not isinstance(row[0], datetime):
         return None
-    try:
-        return datetime.fromisoformat(row[0])
-    except (TypeError, ValueError):
-        return None
-
+    return row[0]
+
+
+_ACTIVE_PORTS_QUERY = """
+    SELECT DISTINCT location_id, station_id, port_id
+    FROM port_status
+    WHERE ts >= %s
+"""
+_RECENT_SESSIONS_QUERY = """
+    SELECT location_id, station_id, port_id, start_ts, duration_min
+    FROM port_sessions
+    WHERE start_ts >= %s
+    ORDER BY location_id, station_id, port_id, start_ts
+"""
+
+
+def recent_sessions(
+    conn: Connection, since: datetime, *, now: datetime | None = None
+) -> Dict[PortKey, List[float]]:
+    """Return session durations per port for sessions started since ``since``.
+
+    Ports reporting in the window without any session map to an empty list;
+    sessions still open are measured up to ``now``. A session is attributed
+    to the window by its recorded start, so one already running at ``since``
+    is not counted, even when the port still reports ``IN_USE`` inside it.
+    """
 
-def recent_sessions(conn: Connection, since: datetime) -> Dict[PortKey, List[float]]:
-    history = _recent_status_history(conn, since)
-    return {k: _session_durations(v) for k, v in history.items()}
+    if now is None:
+        now = _local_now()
+    with _with_cursor(conn) as cur:
+        cur.execute(_ACTIVE_PORTS_QUERY, (since,))
+        sessions: Dict[PortKey, List[float]] = {
+            (loc, sta, port): [] for loc, sta, port in cur.fetchall()
+        }
+        cur.execute(_RECENT_SESSIONS_QUERY, (since,))
+        for port_key, rows in groupby(cur.fetchall(), key=itemgetter(0, 1, 2)):
+            sessions[port_key] = [
+                float((now - start).total_seconds() / 60 if duration is None else duration)
+                for *_, start, duration in rows
+            ]
+    return sessions
 
 
-def analyze_recent(conn: Connection, days: int = 7, short_threshold: int = 3) -> List[Dict[str, Any]]:
-    since = datetime.now().astimezone() - timedelta(days=days)
-    sessions = recent_sessions(conn, since)
+def analyze_recent(
+    conn: Connection,
+    days: int = 7,
+    short_threshold: int = 3,
+    *,
+    now: datetime | None = None,
+) -> List[Dict[str, Any]]:
+    if now is None:
+        now = _local_now()
+    sessions = recent_sessions(conn, now - timedelta(days=days), now=now)
     problematic: List[Dict[str, Any]] = []
     for (loc, sta, port), durs in sessions.items():
         if not durs:
@@ -582,85 +1482,163 @@ def analyze_recent(conn: Connection, days: int = 7, short_threshold: int = 3) ->
     return problematic
 
 
+@dataclass(slots=True)
+class _PortScan:
+    """Aggregates of one port's events used by the charger rules."""
+
+    last_in_use_ts: datetime | None = None
+    max_session_min: float | None = None
+    last_status: int | None = None
+    last_available_ts: datetime | None = None
+
+
+@dataclass(slots=True)
+class _StationScan:
+    """Charger rule flags of one station, folded over its port scans."""
+
+    first_ts: datetime
+    used_recently: bool = False
+    has_long: bool = False
+    all_unavailable: bool = True
+
+
+def _scan_port(
+    events: List[Tuple[datetime, int]], since_long: datetime, now: datetime
+) -> _PortScan:
+    """Collect every rule input for ``events`` in a single pass.
+
+    Sessions only count events from ``since_long`` onwards, and a session still
+    open at the end runs until ``now``.
+    """
+
+    scan = _PortScan()
+    longest: float | None = None
+    start: datetime | None = None
+    in_use = IN_USE_CODE
+    unavailable = UNAVAILABLE_CODES
+    for ts, status in events:
+        if status == in_use:
+            scan.last_in_use_ts = ts
+        if status not in unavailable:
+            scan.last_available_ts = ts
+        if ts >= since_long:
+            if status == in_use:
+                if start is None:
+                    start = ts
+            elif start is not None:
+                duration = (ts - start).total_seconds() / 60
+                if longest is None or duration > longest:
+                    longest = duration
+                start = None
+    if start is not None:
+        duration = (now - start).total_seconds() / 60
+        if longest is None or duration > longest:
+            longest = duration
+    if events:
+        scan.last_status = events[-1][1]
+    scan.max_session_min = longest
+    return scan
+
+
+def _scan_port_chunk(
+    chunk: List[List[Tuple[datetime, int]]], since_long: datetime, now: datetime
+) -> List[_PortScan]:
+    return [_scan_port(events, since_long, now) for events in chunk]
+
+
+def _port_scans(
+    event_lists: List[List[Tuple[datetime, int]]], since_long: datetime, now: datetime
+) -> List[_PortScan] | None:
+    """Scan every port's events, in order, across ``ENDOLLA_ANALYSIS_WORKERS``.
+
+    Returns ``None`` when the ports should be scanned serially instead.
+    """
+
+    workers = _analysis_workers()
+    if workers <= 1 or len(event_lists) <= PORT_CHUNK_SIZE:
+        return None
+    chunks = [
+        event_lists[i : i + PORT_CHUNK_SIZE] for i in range(0, len(event_lists), PORT_CHUNK_SIZE)
+    ]
+    results = _analysis_executor(workers).map(
+        _scan_port_chunk, chunks, repeat(since_long), repeat(now)
+    )
+    return [scan for chunk in results for scan in chunk]
+
+
 def analyze_chargers(
     conn: Connection,
     rules: Rules | None = None,
     *,
     now: datetime | None = None,
-    history: Dict[PortKey, List[Tuple[datetime, str]]] | None = None,
+    history: Dict[PortKey, List[Tuple[datetime, int]]] | None = None,
 ) -> tuple[list[Dict[str, Any]], Dict[str, int]]:
     if rules is None:
         rules = Rules()
     if now is None:
-        now = datetime.now().astimezone()
-    earliest = now - timedelta(
-        days=max(rules.unused_days, rules.long_session_days, rules.unavailable_hours / 24)
-    )
+        now = _local_now()
+    earliest = now - _rules_lookback(rules)
     if history is None:
         history = _recent_status_history(conn, earliest, now)
     else:
-        filtered: Dict[PortKey, List[Tuple[datetime, str]]] = {}
-        for key, events in history.items():
-            ev = [(ts, st) for ts, st in events if earliest <= ts <= now]
-            if ev:
-                filtered[key] = ev
-        history = filtered
-
-    stations: Dict[Tuple[str | None, str | None], Dict[str | None, List[Tuple[datetime, str]]]] = {}
-    for (loc, sta, port), events in history.items():
-        stations.setdefault((loc, sta), {})[port] = events
+        history = _history_window(history, earliest, now)
+
+    unused_window = timedelta(days=rules.unused_days)
+    long_window = timedelta(days=rules.long_session_days)
+    unavail_window = timedelta(hours=rules.unavailable_hours)
+    since_unused = now - unused_window
+    since_long = now - long_window
+    since_unavail = now - unavail_window
+
+    # Ports are scanned independently (possibly in worker processes) and
+    # folded straight into per-station rule flags, so no per-station lists of
+    # ports are kept.
+    event_lists = list(history.values())
+    pooled_scans = _port_scans(event_lists, since_long, now)
+    stations: Dict[Tuple[str | None, str | None], _StationScan] = {}
+    for (loc, sta, _port), events, scan in zip(
+        history, event_lists, repeat(None) if pooled_scans is None else pooled_scans
+    ):
+        # Events are ordered by ts, so each port's first event is its earliest
+        first_ts = events[0][0]
+        station = stations.get((loc, sta))
+        if station is None:
+            station = stations[(loc, sta)] = _StationScan(first_ts)
+        elif first_ts < station.first_ts:
+            station.first_ts = first_ts
+        if station.used_recently and station.has_long and not station.all_unavailable:
+            # No rule can fire for this station any more
+            continue
+        if scan is None:
+            scan = _scan_port(events, since_long, now)
+        if scan.last_in_use_ts is not None and scan.last_in_use_ts >= since_unused:
+            station.used_recently = True
+        if scan.max_session_min is not None and scan.max_session_min >= rules.long_session_min:
+            station.has_long = True
+        if scan.last_status not in UNAVAILABLE_CODES or (
+            scan.last_available_ts is not None and scan.last_available_ts >= since_unavail
+        ):
+            station.all_unavailable = False
 
     problematic: List[Dict[str, Any]] = []
     rule_counts: Dict[str, int] = {"unused": 0, "no_long": 0, "unavailable": 0}
-    for (loc, sta), ports in stations.items():
+    for (loc, sta), station in stations.items():
         reasons: List[str] = []
-        earliest_ts = min(ts for events in ports.values() for ts, _ in events)
-        history_span = now - earliest_ts
-
-        if history_span >= timedelta(days=rules.unused_days):
-            since_unused = now - timedelta(days=rules.unused_days)
-            used_recently = any(
-                any(status == "IN_USE" and ts >= since_unused for ts, status in events)
-                for events in ports.values()
-            )
-            if not used_recently:
-                reasons.append(f"unused > {rules.unused_days}d")
-                rule_counts["unused"] += 1
-
-        if history_span >= timedelta(days=rules.long_session_days):
-            since_long = now - timedelta(days=rules.long_session_days)
-            has_long = any(
-                any(
-                    d >= rules.long_session_min
-                    for d in _session_durations(
-                        [(ts, st) for ts, st in events if ts >= since_long], now=now
-                    )
-                )
-                for events in ports.values()
+        history_span = now - station.first_ts
+
+        if history_span >= unused_window and not station.used_recently:
+            reasons.append(f"unused > {rules.unused_days}d")
+            rule_counts["unused"] += 1
+
+        if history_span >= long_window and not station.has_long:
+            reasons.append(
+                f"no session >= {rules.long_session_min}min in {rules.long_session_days}d"
             )
-            if not has_long:
-                reasons.append(
-                    f"no session >= {rules.long_session_min}min in {rules.long_session_days}d"
-                )
-                rule_counts["no_long"] += 1
-
-        if history_span >= timedelta(hours=rules.unavailable_hours):
-            since_unavail = now - timedelta(hours=rules.unavailable_hours)
-            all_unavail = True
-            for events in ports.values():
-                if not events:
-                    all_unavail = False
-                    break
-                last_status = events[-1][1]
-                if last_status not in UNAVAILABLE_STATUSES:
-                    all_unavail = False
-                    break
-                if any(ts >= since_unavail and st not in UNAVAILABLE_STATUSES for ts, st in events):
-                    all_unavail = False
-                    break
-            if all_unavail and ports:
-                reasons.append(f"unavailable > {rules.unavailable_hours}h")
-                rule_counts["unavailable"] += 1
+            rule_counts["no_long"] += 1
+
+        if history_span >= unavail_window and station.all_unavailable:
+            reasons.append(f"unavailable > {rules.unavailable_hours}h")
+            rule_counts["unavailable"] += 1
 
         if reasons:
             problematic.append(
@@ -675,24 +1653,195 @@ def analyze_chargers(
     return problematic, rule_counts
 
 
-def _latest_records(conn: Connection) -> List[Dict[str, Any]]:
-    query = """
-        SELECT ps.location_id, ps.station_id, ps.port_id, ps.status, ps.last_updated
-        FROM port_status ps
-        JOIN (
-            SELECT location_id, station_id, port_id, MAX(ts) AS max_ts
-            FROM port_status
-            GROUP BY location_id, station_id, port_id
-        ) latest
-        ON ps.location_id <=> latest.location_id
-        AND ps.station_id <=> latest.station_id
-        AND ps.port_id <=> latest.port_id
-        AND ps.ts = latest.max_ts
+@dataclass(slots=True)
+class _PortRuleIndex:
+    """Per-port lookup arrays for evaluating charger rules at any instant."""
+
+    timestamps: List[datetime]
+    in_use_ts: List[datetime]
+    available_ts: List[datetime]
+    statuses: List[int]
+    run_starts: List[int]
+    run_ends: List[int]
+    long_runs_prefix: List[int]
+
+
+def _port_rule_index(events: List[Tuple[datetime, int]], long_session_min: int) -> _PortRuleIndex:
+    timestamps = [ts for ts, _ in events]
+    statuses = [status for _, status in events]
+    run_starts: List[int] = []
+    run_ends: List[int] = []
+    for index, status in enumerate(statuses):
+        if status == IN_USE_CODE:
+            if len(run_starts) == len(run_ends):
+                run_starts.append(index)
+        elif len(run_starts) > len(run_ends):
+            run_ends.append(index)
+    if len(run_starts) > len(run_ends):
+        run_ends.append(len(statuses))
+    # Number of closed runs long enough to count as a long session, so the
+    # runs fully inside a window can be checked with a single subtraction.
+    long_runs_prefix = [0]
+    for start, end in zip(run_starts, run_ends):
+        is_long = (
+            end < len(timestamps)
+            and (timestamps[end] - timestamps[start]).total_seconds() / 60 >= long_session_min
+        )
+        long_runs_prefix.append(long_runs_prefix[-1] + int(is_long))
+    return _PortRuleIndex(
+        timestamps=timestamps,
+        in_use_ts=[ts for ts, status in events if status == IN_USE_CODE],
+        available_ts=[ts for ts, status in events if status not in UNAVAILABLE_CODES],
+        statuses=statuses,
+        run_starts=run_starts,
+        run_ends=run_ends,
+        long_runs_prefix=long_runs_prefix,
+    )
+
+
+def _has_long_session(
+    port: _PortRuleIndex, lo: int, hi: int, now: datetime, long_session_min: int
+) -> bool:
+    """Return whether events ``[lo, hi)`` contain a session of the given length."""
+
+    first = bisect_right(port.run_ends, lo)
+    last = bisect_left(port.run_starts, hi)
+    if first >= last:
+        return False
+    timestamps = port.timestamps
+    for run in {first, last - 1}:
+        start = timestamps[max(port.run_starts[run], lo)]
+        run_end = port.run_ends[run]
+        end = timestamps[run_end] if run_end < hi else now
+        if (end - start).total_seconds() / 60 >= long_session_min:
+            return True
+    if last - first > 2:
+        return port.long_runs_prefix[last - 1] - port.long_runs_prefix[first + 1] > 0
+    return False
+
+
+def analyze_chargers_series(
+    conn: Connection,
+    rules: Rules | None,
+    slot_ends: Sequence[datetime],
+    history: Dict[PortKey, List[Tuple[datetime, int]]] | None = None,
+) -> List[int]:
+    """Return the number of problematic stations at each of ``slot_ends``.
+
+    Equivalent to calling :func:`analyze_chargers` for every slot, but each
+    port's events are indexed once and every rule is answered by bisection.
+    ``history`` events must be ordered by timestamp.
     """
+
+    if rules is None:
+        rules = Rules()
+    if not slot_ends:
+        return []
+    lookback = _rules_lookback(rules)
+    if history is None:
+        history = _recent_status_history(conn, min(slot_ends) - lookback, max(slot_ends))
+
+    stations: Dict[Tuple[str | None, str | None], List[_PortRuleIndex]] = defaultdict(list)
+    for (loc, sta, _port), events in history.items():
+        if events:
+            stations[(loc, sta)].append(_port_rule_index(events, rules.long_session_min))
+
+    unused_window = timedelta(days=rules.unused_days)
+    long_window = timedelta(days=rules.long_session_days)
+    unavailable_window = timedelta(hours=rules.unavailable_hours)
+    counts: List[int] = []
+    for now in slot_ends:
+        earliest = now - lookback
+        since_unused = now - unused_window
+        since_long = now - long_window
+        since_unavail = now - unavailable_window
+        problematic = 0
+        for ports in stations.values():
+            active: List[Tuple[_PortRuleIndex, int]] = []
+            earliest_ts: datetime | None = None
+            for port in ports:
+                lo = bisect_left(port.timestamps, earliest)
+                hi = bisect_right(port.timestamps, now)
+                if hi <= lo:
+                    continue
+                active.append((port, hi))
+                first_ts = port.timestamps[lo]
+                if earliest_ts is None or first_ts < earliest_ts:
+                    earliest_ts = first_ts
+            if earliest_ts is None:
+                continue
+            history_span = now - earliest_ts
+
+            if history_span >= unused_window:
+                used_recently = False
+                for port, _hi in active:
+                    index = bisect_right(port.in_use_ts, now)
+                    if index and port.in_use_ts[index - 1] >= since_unused:
+                        used_recently = True
+                        break
+                if not used_recently:
+                    problematic += 1
+                    continue
+
+            if history_span >= long_window:
+                has_long = any(
+                    _has_long_session(
+                        port,
+                        bisect_left(port.timestamps, since_long),
+                        hi,
+                        now,
+                        rules.long_session_min,
+                    )
+                    for port, hi in active
+                )
+                if not has_long:
+                    problematic += 1
+                    continue
+
+            if history_span >= unavailable_window:
+                all_unavail = True
+                for port, hi in active:
+                    if port.statuses[hi - 1] not in UNAVAILABLE_CODES:
+                        all_unavail = False
+                        break
+                    index = bisect_right(port.available_ts, now)
+                    if index and port.available_ts[index - 1] >= since_unavail:
+                        all_unavail = False
+                        break
+                if all_unavail:
+                    problematic += 1
+        counts.append(problematic)
+    return counts
+
+
+# port_latest_status keys cannot be NULL, so missing identifiers are stored
+# as empty strings and mapped back here.
+_LATEST_RECORDS_QUERY = """
+    SELECT
+        NULLIF(pl.location_id, ''),
+        NULLIF(pl.station_id, ''),
+        NULLIF(pl.port_id, ''),
+        pl.status,
+        sc.status,
+        pl.last_updated
+    FROM port_latest_status pl
+    LEFT JOIN status_codes sc ON sc.code = pl.status
+"""
+
+
+def _latest_status_map(conn: Connection) -> Dict[PortKey, int]:
+    """Return the most recent stored status code for every port."""
+
+    with _with_cursor(conn) as cur:
+        cur.execute(_LATEST_RECORDS_QUERY)
+        return {(loc, sta, port): code for loc, sta, port, code, _, _ in cur.fetchall()}
+
+
+def _latest_records(conn: Connection) -> List[Dict[str, Any]]:
     results: List[Dict[str, Any]] = []
     with _with_cursor(conn) as cur:
-        cur.execute(query)
-        for loc, sta, port, status, last in cur.fetchall():
+        cur.execute(_LATEST_RECORDS_QUERY)
+        for loc, sta, port, _code, status, last in cur.fetchall():
             results.append(
                 {
                     "location_id": loc,
@@ -716,23 +1865,19 @@ def latest_status_by_locations(
 
     placeholders = ", ".join(["%s"] * len(filtered_ids))
     query = f"""
-        SELECT ps.location_id, ps.station_id, ps.port_id, ps.status, ps.last_updated
-        FROM port_status ps
-        JOIN (
-            SELECT location_id, station_id, port_id, MAX(ts) AS max_ts
-            FROM port_status
-            WHERE location_id IN ({placeholders})
-            GROUP BY location_id, station_id, port_id
-        ) latest
-        ON ps.location_id <=> latest.location_id
-        AND ps.station_id <=> latest.station_id
-        AND ps.port_id <=> latest.port_id
-        AND ps.ts = latest.max_ts
-        WHERE ps.location_id IN ({placeholders})
+        SELECT
+            pl.location_id,
+            NULLIF(pl.station_id, ''),
+            NULLIF(pl.port_id, ''),
+            sc.status,
+            pl.last_updated
+        FROM port_latest_status pl
+        LEFT JOIN status_codes sc ON sc.code = pl.status
+        WHERE pl.location_id IN ({placeholders})
     """
 
     grouped: Dict[str, List[Dict[str, Any]]] = {}
-    params = tuple(filtered_ids) * 2
+    params = tuple(filtered_ids)
     with _with_cursor(conn) as cur:
         cur.execute(query, params)
         for loc, sta, port, status, last_updated in cur.fetchall():
@@ -748,25 +1893,18 @@ def latest_status_by_locations(
     return grouped
 
 
-def _all_history(conn: Connection) -> Dict[PortKey, List[Tuple[datetime, str]]]:
-    history: Dict[PortKey, List[Tuple[datetime, str]]] = {}
-    with _with_cursor(conn) as cur:
-        cur.execute(
-            "SELECT location_id, station_id, port_id, ts, status FROM port_status ORDER BY location_id, station_id, port_id, ts"
-        )
-        for loc, sta, port, ts_str, status in cur.fetchall():
-            history.setdefault((loc, sta, port), []).append((datetime.fromisoformat(ts_str), status))
-    return history
+def _all_history(conn: Connection) -> Dict[PortKey, List[Tuple[datetime, int]]]:
+    return _stream_history(conn, _ALL_HISTORY_QUERY, ())
 
 
 def _station_outage_durations(
-    station_events: Dict[str | None, List[Tuple[datetime, str]]],
+    station_events: Dict[str | None, List[Tuple[datetime, int]]],
     *,
     now: datetime,
 ) -> List[float]:
     if not station_events:
         return []
-    timeline: List[Tuple[datetime, str | None, str]] = []
+    timeline: List[Tuple[datetime, str | None, int]] = []
     for port_id, events in station_events.items():
         for ts, status in events:
             if ts <= now:
@@ -775,7 +1913,7 @@ def _station_outage_durations(
         return []
     timeline.sort(key=lambda item: item[0])
 
-    statuses: Dict[str | None, str | None] = {
+    statuses: Dict[str | None, int | None] = {
         port_id: None for port_id, events in station_events.items() if events
     }
     if not statuses:
@@ -784,7 +1922,7 @@ def _station_outage_durations(
     def station_down() -> bool:
         if any(status is None for status in statuses.values()):
             return False
-        return bool(statuses) and all(status in UNAVAILABLE_STATUSES for status in statuses.values())
+        return bool(statuses) and all(status in UNAVAILABLE_CODES for status in statuses.values())
 
     durations: List[float] = []
     current_down = station_down()
@@ -811,43 +1949,72 @@ def _count_unused_chargers(
     conn: Connection,
     days: int,
     now: datetime,
-    history: Dict[PortKey, List[Tuple[datetime, str]]] | None = None,
+    history: Dict[PortKey, List[Tuple[datetime, int]]] | None = None,
 ) -> int:
+    return _count_unused_chargers_multi(conn, (days,), now, history=history)[0]
+
+
+def _count_unused_chargers_multi(
+    conn: Connection,
+    thresholds: Sequence[int],
+    now: datetime,
+    history: Dict[PortKey, List[Tuple[datetime, int]]] | None = None,
+) -> Tuple[int, ...]:
+    """Count unused stations for several day thresholds in a single pass.
+
+    Each station's earliest event and most recent ``IN_USE`` event up to
+    ``now`` are located by bisecting the ordered events and then compared
+    against every threshold.
+    """
+
     if history is None:
         history = _all_history(conn)
-    else:
-        history = {
-            k: [(ts, st) for ts, st in v if ts <= now]
-            for k, v in history.items()
-            if any(ts <= now for ts, _ in v)
-        }
-    stations: Dict[Tuple[str | None, str | None], Dict[str | None, List[Tuple[datetime, str]]]] = {}
-    for (loc, sta, port), events in history.items():
-        stations.setdefault((loc, sta), {})[port] = events
-    count = 0
-    for ports in stations.values():
-        earliest_ts = min(ts for events in ports.values() for ts, _ in events)
-        history_span = now - earliest_ts
-        if history_span >= timedelta(days=days):
-            since_unused = now - timedelta(days=days)
-            used_recently = any(
-                any(status == "IN_USE" and ts >= since_unused for ts, status in events)
-                for events in ports.values()
-            )
-            if not used_recently:
+    # (earliest event, latest IN_USE event) per station, ignoring events after now
+    stations: Dict[Tuple[str | None, str | None], Tuple[datetime, datetime | None]] = {}
+    for (loc, sta, _port), events in history.items():
+        # Events are ordered by ts, so only the prefix up to now is relevant
+        end = bisect_right(events, now, key=itemgetter(0))
+        if not end:
+            continue
+        earliest = events[0][0]
+        last_in_use: datetime | None = None
+        for idx in range(end - 1, -1, -1):
+            ts, status = events[idx]
+            if status == IN_USE_CODE:
+                last_in_use = ts
+                break
+        station_key = (loc, sta)
+        previous = stations.get(station_key)
+        if previous is not None:
+            prev_earliest, prev_in_use = previous
+            earliest = min(earliest, prev_earliest)
+            if last_in_use is None or (prev_in_use is not None and prev_in_use > last_in_use):
+                last_in_use = prev_in_use
+        stations[station_key] = (earliest, last_in_use)
+
+    counts: List[int] = []
+    for days in thresholds:
+        window = timedelta(days=days)
+        since_unused = now - window
+        count = 0
+        for earliest, last_in_use in stations.values():
+            if now - earliest < window:
+                continue
+            if last_in_use is None or last_in_use < since_unused:
                 count += 1
-    return count
+        counts.append(count)
+    return tuple(counts)
 
 
 def _status_intervals(
-    events: List[Tuple[datetime, str | None]],
+    events: List[Tuple[datetime, int]],
     *,
     end: datetime,
-) -> List[Tuple[datetime, datetime, str | None]]:
+) -> List[Tuple[datetime, datetime, int]]:
     if not events:
         return []
     ordered = sorted(events, key=lambda item: item[0])
-    intervals: List[Tuple[datetime, datetime, str | None]] = []
+    intervals: List[Tuple[datetime, datetime, int]] = []
     prev_ts, prev_status = ordered[0]
     if prev_ts >= end:
         return []
@@ -866,39 +2033,32 @@ def _status_intervals(
     return [(start, stop, status) for start, stop, status in intervals if stop > start]
 
 
-def _empty_totals() -> Dict[str, float]:
-    return {
-        "sessions": 0.0,
-        "monitored_seconds": 0.0,
-        "available_seconds": 0.0,
-        "occupied_seconds": 0.0,
-        "active_seconds": 0.0,
-        "port_count": 0.0,
-    }
+@dataclass(slots=True)
+class UsageTotals:
+    """Accumulated usage seconds and session counts for ports."""
 
+    sessions: float = 0.0
+    monitored_seconds: float = 0.0
+    available_seconds: float = 0.0
+    occupied_seconds: float = 0.0
+    active_seconds: float = 0.0
+    port_count: float = 0.0
 
-def _accumulate_totals(target: Dict[str, float], source: Dict[str, float]) -> None:
-    target["sessions"] = target.get("sessions", 0.0) + source.get("sessions", 0.0)
-    target["monitored_seconds"] = target.get("monitored_seconds", 0.0) + source.get(
-        "monitored_seconds", 0.0
-    )
-    target["available_seconds"] = target.get("available_seconds", 0.0) + source.get(
-        "available_seconds", 0.0
-    )
-    target["occupied_seconds"] = target.get("occupied_seconds", 0.0) + source.get(
-        "occupied_seconds", 0.0
-    )
-    target["active_seconds"] = target.get("active_seconds", 0.0) + source.get(
-        "active_seconds", 0.0
-    )
-    target["port_count"] = target.get("port_count", 0.0) + source.get("port_count", 0.0)
+
+def _accumulate_totals(target: UsageTotals, source: UsageTotals) -> None:
+    target.sessions += source.sessions
+    target.monitored_seconds += source.monitored_seconds
+    target.available_seconds += source.available_seconds
+    target.occupied_seconds += source.occupied_seconds
+    target.active_seconds += source.active_seconds
+    target.port_count += source.port_count
 
 
 def _compute_port_utilization(
-    events: List[Tuple[datetime, str]],
+    events: List[Tuple[datetime, int]],
     *,
     now: datetime,
-) -> Dict[str, float] | None:
+) -> UsageTotals | None:
     intervals = _status_intervals(events, end=now)
     if not intervals:
         return None
@@ -913,30 +2073,30 @@ def _compute_port_utilization(
         if duration <= 0:
             continue
         total_seconds += duration
-        if status is not None and status not in UNAVAILABLE_STATUSES:
+        if status not in UNAVAILABLE_OR_MISSING_CODES:
             available_seconds += duration
-        if status in OCCUPIED_STATUSES:
+        if status in OCCUPIED_CODES:
             occupied_seconds += duration
-        if status in ACTIVE_CHARGING_STATUSES:
+        if status in ACTIVE_CHARGING_CODES:
             active_seconds += duration
     if total_seconds <= 0:
         return None
-    sessions = len(_session_durations(events, now=now))
-    return {
-        "sessions": float(sessions),
-        "monitored_seconds": total_seconds,
-        "available_seconds": available_seconds,
-        "occupied_seconds": occupied_seconds,
-        "active_seconds": active_seconds,
-        "port_count": 1.0,
-    }
+    sessions = _session_count(events)
+    return UsageTotals(
+        sessions=float(sessions),
+        monitored_seconds=total_seconds,
+        available_seconds=available_seconds,
+        occupied_seconds=occupied_seconds,
+        active_seconds=active_seconds,
+        port_count=1.0,
+    )
 
 
 def _compute_port_usage_between(
-    events: List[Tuple[datetime, str]],
+    events: List[Tuple[datetime, int]],
     start: datetime,
     end: datetime,
-) -> Dict[str, float] | None:
+) -> UsageTotals | None:
     if not events or end <= start:
         return None
     intervals = _status_intervals(events, end=end)
@@ -955,11 +2115,11 @@ def _compute_port_usage_between(
         if duration <= 0:
             continue
         total_seconds += duration
-        if status is not None and status not in UNAVAILABLE_STATUSES:
+        if status not in UNAVAILABLE_OR_MISSING_CODES:
             available_seconds += duration
-        if status in OCCUPIED_STATUSES:
+        if status in OCCUPIED_CODES:
             occupied_seconds += duration
-        if status in ACTIVE_CHARGING_STATUSES:
+        if status in ACTIVE_CHARGING_CODES:
             active_seconds += duration
     if total_seconds <= 0:
         return None
@@ -969,13 +2129,13 @@ def _compute_port_usage_between(
     session_count = 0
     for ts, status in ordered:
         if ts < start:
-            if status == "IN_USE":
+            if status == IN_USE_CODE:
                 in_session = True
-            elif in_session and status != "IN_USE":
+            elif in_session and status != IN_USE_CODE:
                 session_count += 1
                 in_session = False
             continue
-        if status == "IN_USE":
+        if status == IN_USE_CODE:
             if not in_session:
                 in_session = True
         else:
@@ -985,62 +2145,164 @@ def _compute_port_usage_between(
     if in_session:
         session_count += 1
 
-    return {
-        "sessions": float(session_count),
-        "monitored_seconds": total_seconds,
-        "available_seconds": available_seconds,
-        "occupied_seconds": occupied_seconds,
-        "active_seconds": active_seconds,
-        "port_count": 1.0,
-    }
+    return UsageTotals(
+        sessions=float(session_count),
+        monitored_seconds=total_seconds,
+        available_seconds=available_seconds,
+        occupied_seconds=occupied_seconds,
+        active_seconds=active_seconds,
+        port_count=1.0,
+    )
 
 
-def _format_utilization_metrics(totals: Dict[str, float]) -> Dict[str, float]:
-    monitored_seconds = totals.get("monitored_seconds", 0.0)
-    available_seconds = totals.get("available_seconds", 0.0)
-    occupied_seconds = totals.get("occupied_seconds", 0.0)
-    active_seconds = totals.get("active_seconds", 0.0)
-    sessions_raw = totals.get("sessions", 0.0)
+_UTILIZATION_METRIC_KEYS: Tuple[str, ...] = (
+    "sessions",
+    "monitored_seconds",
+    "monitored_hours",
+    "monitored_days",
+    "available_seconds",
+    "occupied_seconds",
+    "active_seconds",
+    "session_count_per_day",
+    "session_count_per_hour",
+    "occupation_utilization_pct",
+    "active_charging_utilization_pct",
+    "availability_ratio",
+)
+
+
+def _utilization_metric_values(
+    monitored_seconds: float,
+    available_seconds: float,
+    occupied_seconds: float,
+    active_seconds: float,
+    sessions_raw: float,
+) -> Tuple[float | int, ...]:
     if isinstance(sessions_raw, float) and sessions_raw.is_integer():
         sessions_value: float | int = int(sessions_raw)
     else:
         sessions_value = sessions_raw
     hours = monitored_seconds / 3600 if monitored_seconds else 0.0
     days = monitored_seconds / 86400 if monitored_seconds else 0.0
-    return {
-        "sessions": sessions_value,
-        "monitored_seconds": monitored_seconds,
-        "monitored_hours": hours,
-        "monitored_days": days,
-        "available_seconds": available_seconds,
-        "occupied_seconds": occupied_seconds,
-        "active_seconds": active_seconds,
-        "session_count_per_day": sessions_raw / days if days else 0.0,
-        "session_count_per_hour": sessions_raw / hours if hours else 0.0,
-        "occupation_utilization_pct": (occupied_seconds / available_seconds) * 100
-        if available_seconds
-        else 0.0,
-        "active_charging_utilization_pct": (active_seconds / available_seconds) * 100
-        if available_seconds
-        else 0.0,
-        "availability_ratio": (available_seconds / monitored_seconds)
-        if monitored_seconds
-        else 0.0,
-    }
+    return (
+        sessions_value,
+        monitored_seconds,
+        hours,
+        days,
+        available_seconds,
+        occupied_seconds,
+        active_seconds,
+        sessions_raw / days if days else 0.0,
+        sessions_raw / hours if hours else 0.0,
+        (occupied_seconds / available_seconds) * 100 if available_seconds else 0.0,
+        (active_seconds / available_seconds) * 100 if available_seconds else 0.0,
+        (available_seconds / monitored_seconds) if monitored_seconds else 0.0,
+    )
+
+
+_cached_utilization_metric_values = lru_cache(maxsize=4096)(_utilization_metric_values)
+
+
+def _format_utilization_metrics(totals: UsageTotals) -> Dict[str, float]:
+    """Derive the utilization metrics for accumulated ``totals``.
+
+    Summary rollups often repeat the same totals (single-port stations,
+    idle ports), so the derived values are memoized.
+    """
+
+    values = _cached_utilization_metric_values(
+        totals.monitored_seconds,
+        totals.available_seconds,
+        totals.occupied_seconds,
+        totals.active_seconds,
+        totals.sessions,
+    )
+    return dict(zip(_UTILIZATION_METRIC_KEYS, values))
+
+
+def _analysis_workers() -> int:
+    """Return the number of processes to use for per-port analysis."""
+
+    raw = os.getenv(ANALYSIS_WORKERS_ENV, "1").strip().lower()
+    if raw in {"auto", "0"}:
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        logger.warning("Invalid %s value '%s'; analysing serially", ANALYSIS_WORKERS_ENV, raw)
+        return 1
+
+
+# Process pools for per-port analysis, keyed by worker count
+_EXECUTORS: Dict[int, ProcessPoolExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def _analysis_executor(workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool with ``workers`` processes.
+
+    Analysis is called from API request threads, so the pool is created once
+    and spawns its workers rather than forking the threaded server.
+    """
+
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.get(workers)
+        if executor is None:
+            executor = _EXECUTORS[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return executor
+
+
+@atexit.register
+def _shutdown_analysis_executors() -> None:
+    with _EXECUTORS_LOCK:
+        for executor in _EXECUTORS.values():
+            executor.shutdown(cancel_futures=True)
+        _EXECUTORS.clear()
+
+
+def _port_utilization_chunk(
+    chunk: List[Tuple[PortKey, List[Tuple[datetime, int]]]],
+    now: datetime,
+) -> List[Tuple[PortKey, UsageTotals | None]]:
+    return [(key, _compute_port_utilization(events, now=now)) for key, events in chunk]
+
+
+def _port_utilization_totals(
+    history: Dict[PortKey, List[Tuple[datetime, int]]],
+    *,
+    now: datetime,
+) -> List[Tuple[PortKey, UsageTotals | None]]:
+    """Compute utilization totals for every port, in ``history`` order.
+
+    Ports are independent, so with ``ENDOLLA_ANALYSIS_WORKERS`` above one
+    they are processed in chunks of :data:`PORT_CHUNK_SIZE` by the shared
+    process pool.
+    """
+
+    items = list(history.items())
+    workers = _analysis_workers()
+    if workers <= 1 or len(items) <= PORT_CHUNK_SIZE:
+        return _port_utilization_chunk(items, now)
+    chunks = [items[i : i + PORT_CHUNK_SIZE] for i in range(0, len(items), PORT_CHUNK_SIZE)]
+    results = _analysis_executor(workers).map(_port_utilization_chunk, chunks, repeat(now))
+    return [row for chunk in results for row in chunk]
 
 
 def _utilization_summary(
-    history: Dict[PortKey, List[Tuple[datetime, str]]],
+    history: Dict[PortKey, List[Tuple[datetime, int]]],
     *,
     now: datetime,
 ) -> Dict[str, Any]:
     port_rows: List[Dict[str, Any]] = []
-    station_totals: Dict[Tuple[str | None, str | None], Dict[str, Any]] = {}
-    location_totals: Dict[str | None, Dict[str, Any]] = {}
-    network_totals = _empty_totals()
+    station_totals: Dict[Tuple[str | None, str | None], UsageTotals] = defaultdict(UsageTotals)
+    location_totals: Dict[str | None, UsageTotals] = defaultdict(UsageTotals)
+    # Only known station ids are tracked, so the counts need no filtering
+    location_station_ids: Dict[str | None, set[str]] = defaultdict(set)
+    network_totals = UsageTotals()
 
-    for (loc, sta, port), events in history.items():
-        totals = _compute_port_utilization(events, now=now)
+    for (loc, sta, port), totals in _port_utilization_totals(history, now=now):
         if totals is None:
             continue
         metrics = _format_utilization_metrics(totals)
@@ -1053,19 +2315,11 @@ def _utilization_summary(
             }
         )
 
-        station_key = (loc, sta)
-        station_acc = station_totals.setdefault(station_key, _empty_totals())
-        _accumulate_totals(station_acc, totals)
+        _accumulate_totals(station_totals[(loc, sta)], totals)
 
-        location_acc = location_totals.setdefault(
-            loc,
-            {
-                **_empty_totals(),
-                "station_ids": set(),
-            },
-        )
-        _accumulate_totals(location_acc, totals)
-        location_acc["station_ids"].add(sta)
+        _accumulate_totals(location_totals[loc], totals)
+        if sta is not None:
+            location_station_ids[loc].add(sta)
 
         _accumulate_totals(network_totals, totals)
 
@@ -1084,7 +2338,7 @@ def _utilization_summary(
             {
                 "location_id": loc,
                 "station_id": sta,
-                "port_count": int(totals.get("port_count", 0)),
+                "port_count": int(totals.port_count),
             }
         )
         station_rows.append(metrics)
@@ -1094,13 +2348,12 @@ def _utilization_summary(
 
     location_rows: List[Dict[str, Any]] = []
     for loc, totals in location_totals.items():
-        station_ids = totals.pop("station_ids", set())
         metrics = _format_utilization_metrics(totals)
         metrics.update(
             {
                 "location_id": loc,
-                "station_count": len({sid for sid in station_ids if sid is not None}),
-                "port_count": int(totals.get("port_count", 0)),
+                "station_count": len(location_station_ids[loc]),
+                "port_count": int(totals.port_count),
             }
         )
         location_rows.append(metrics)
@@ -1109,9 +2362,9 @@ def _utilization_summary(
     network_metrics = _format_utilization_metrics(network_totals)
     network_metrics.update(
         {
-            "port_count": int(network_totals.get("port_count", 0)),
+            "port_count": int(network_totals.port_count),
             "station_count": len(station_totals),
-            "location_count": len({loc for loc in location_totals.keys() if loc is not None}),
+            "location_count": len(location_totals) - (None in location_totals),
         }
     )
 
@@ -1123,49 +2376,146 @@ def _utilization_summary(
     }
 
 
-def _location_usage_timeline(
-    history: Dict[Tuple[str | None, str | None], List[Tuple[datetime, str]]],
-    start: datetime,
-    end: datetime,
-    step: timedelta,
-) -> List[Dict[str, Any]]:
-    timeline: List[Dict[str, Any]] = []
-    current = start
-    while current < end:
-        bucket_end = min(current + step, end)
-        bucket_totals = _empty_totals()
-        for events in history.values():
-            totals = _compute_port_usage_between(events, current, bucket_end)
-            if totals is None:
-                continue
-            _accumulate_totals(bucket_totals, totals)
-        entry: Dict[str, Any] = {
-            "start": current.isoformat(),
-            "end": bucket_end.isoformat(),
-            "port_count": int(bucket_totals.get("port_count", 0)),
-            "monitored_seconds": bucket_totals.get("monitored_seconds", 0.0),
-            "available_seconds": bucket_totals.get("available_seconds", 0.0),
-            "occupied_seconds": bucket_totals.get("occupied_seconds", 0.0),
-            "active_seconds": bucket_totals.get("active_seconds", 0.0),
-            "sessions": bucket_totals.get("sessions", 0.0),
-        }
-        if bucket_totals.get("monitored_seconds", 0.0) > 0:
-            entry.update(_format_utilization_metrics(bucket_totals))
-        else:
-            entry.update(
-                {
-                    "monitored_hours": 0.0,
-                    "monitored_days": 0.0,
-                    "session_count_per_day": 0.0,
-                    "session_count_per_hour": 0.0,
-                    "occupation_utilization_pct": 0.0,
-                    "active_charging_utilization_pct": 0.0,
-                    "availability_ratio": 0.0,
-                }
+def _bucket_bounds(
+    start: datetime, end: datetime, step: timedelta
+) -> List[Tuple[datetime, datetime]]:
+    """Return consecutive ``step`` sized buckets covering ``[start, end)``.
+
+    The final bucket is clamped to ``end`` when the span is not a multiple of
+    ``step``.
+    """
+
+    span = end - start
+    if span <= timedelta(0):
+        return []
+    count = span // step + (1 if span % step else 0)
+    starts = [start + step * index for index in range(count)]
+    ends = starts[1:] + [end]
+    return list(zip(starts, ends))
+
+
+def _timeline_entry(
+    bucket_start: datetime, bucket_end: datetime, totals: UsageTotals
+) -> Dict[str, Any]:
+    monitored = totals.monitored_seconds
+    available = totals.available_seconds
+    occupied = totals.occupied_seconds
+    active = totals.active_seconds
+    sessions = totals.sessions
+    entry: Dict[str, Any] = {
+        "start": bucket_start.isoformat(),
+        "end": bucket_end.isoformat(),
+        "port_count": int(totals.port_count),
+        "monitored_seconds": monitored,
+        "available_seconds": available,
+        "occupied_seconds": occupied,
+        "active_seconds": active,
+        "sessions": sessions,
+    }
+    if monitored > 0:
+        # Bucket totals rarely repeat, so skip the memoized formatter.
+        entry.update(
+            zip(
+                _UTILIZATION_METRIC_KEYS,
+                _utilization_metric_values(monitored, available, occupied, active, sessions),
             )
-        timeline.append(entry)
-        current = bucket_end
-    return timeline
+        )
+    else:
+        entry.update(
+            {
+                "monitored_hours": 0.0,
+                "monitored_days": 0.0,
+                "session_count_per_day": 0.0,
+                "session_count_per_hour": 0.0,
+                "occupation_utilization_pct": 0.0,
+                "active_charging_utilization_pct": 0.0,
+                "availability_ratio": 0.0,
+            }
+        )
+    return entry
+
+
+def _location_usage_timelines(
+    history: Dict[Tuple[str | None, str | None], List[Tuple[datetime, int]]],
+    periods: List[Tuple[datetime, datetime, timedelta]],
+) -> List[List[Dict[str, Any]]]:
+    """Build one usage timeline per ``(start, end, step)`` period.
+
+    Each port's status intervals are computed once and distributed into the
+    buckets of every period in a single sweep.
+    """
+
+    bounds = [_bucket_bounds(start, end, step) for start, end, step in periods]
+    bucket_totals = [[UsageTotals() for _ in buckets] for buckets in bounds]
+    sweep_end = max((buckets[-1][1] for buckets in bounds if buckets), default=None)
+    if sweep_end is None:
+        return [[] for _ in periods]
+
+    for events in history.values():
+        intervals = _status_intervals(events, end=sweep_end)
+        if not intervals:
+            continue
+        # A port's last status carries forward, so a port is only skipped
+        # for a period when its first event comes after the period ends.
+        first_ts = intervals[0][0]
+        interval_ends = [interval_end for _start, interval_end, _status in intervals]
+        sessions: float | None = None
+        for (start, _end, step), buckets, totals_row in zip(
+            periods, bounds, bucket_totals
+        ):
+            if not buckets:
+                continue
+            period_end = buckets[-1][1]
+            if first_ts >= period_end:
+                continue
+            port_buckets: Dict[int, List[float]] = {}
+            for interval_start, interval_end, status in islice(
+                intervals, bisect_right(interval_ends, start), None
+            ):
+                if interval_start >= period_end:
+                    break
+                index = max(0, (interval_start - start) // step)
+                while index < len(buckets):
+                    bucket_start, bucket_end = buckets[index]
+                    if bucket_start >= interval_end:
+                        break
+                    seg_start = max(interval_start, bucket_start)
+                    seg_end = min(interval_end, bucket_end)
+                    if seg_end > seg_start:
+                        duration = (seg_end - seg_start).total_seconds()
+                        acc = port_buckets.get(index)
+                        if acc is None:
+                            acc = port_buckets[index] = [0.0, 0.0, 0.0, 0.0]
+                        acc[0] += duration
+                        if status not in UNAVAILABLE_OR_MISSING_CODES:
+                            acc[1] += duration
+                        if status in OCCUPIED_CODES:
+                            acc[2] += duration
+                        if status in ACTIVE_CHARGING_CODES:
+                            acc[3] += duration
+                    index += 1
+            if not port_buckets:
+                continue
+            if sessions is None:
+                sessions = float(_session_count(events))
+            for index, (monitored, available, occupied, active) in port_buckets.items():
+                if monitored <= 0:
+                    continue
+                totals = totals_row[index]
+                totals.sessions += sessions
+                totals.monitored_seconds += monitored
+                totals.available_seconds += available
+                totals.occupied_seconds += occupied
+                totals.active_seconds += active
+                totals.port_count += 1.0
+
+    return [
+        [
+            _timeline_entry(bucket_start, bucket_end, totals)
+            for (bucket_start, bucket_end), totals in zip(buckets, totals_row)
+        ]
+        for buckets, totals_row in zip(bounds, bucket_totals)
+    ]
 
 
 def location_usage(
@@ -1175,7 +2525,7 @@ def location_usage(
     now: datetime | None = None,
 ) -> Dict[str, Any] | None:
     if now is None:
-        now = datetime.now().astimezone()
+        now = _local_now()
     lookback_start = now - timedelta(days=8)
     history = _recent_location_history(conn, location_id, lookback_start, now)
     if not history:
@@ -1184,8 +2534,8 @@ def location_usage(
     day_start = now - timedelta(hours=24)
     week_start = now - timedelta(days=7)
 
-    day_totals = _empty_totals()
-    week_totals = _empty_totals()
+    day_totals = UsageTotals()
+    week_totals = UsageTotals()
     station_ids: set[str | None] = set()
     port_ids: set[Tuple[str | None, str | None]] = set()
     station_rollups: Dict[str, Dict[str, Any]] = {}
@@ -1207,8 +2557,8 @@ def location_usage(
                 rollup = {
                     "station_id": station_key,
                     "port_ids": set(),
-                    "day_totals": _empty_totals(),
-                    "week_totals": _empty_totals(),
+                    "day_totals": UsageTotals(),
+                    "week_totals": UsageTotals(),
                     "last_updated": None,
                 }
                 station_rollups[station_key] = rollup
@@ -1225,8 +2575,13 @@ def location_usage(
                     if previous is None or last_ts > previous:
                         rollup["last_updated"] = last_ts
 
-    day_timeline = _location_usage_timeline(history, day_start, now, timedelta(hours=1))
-    week_timeline = _location_usage_timeline(history, week_start, now, timedelta(days=1))
+    day_timeline, week_timeline = _location_usage_timelines(
+        history,
+        [
+            (day_start, now, timedelta(hours=1)),
+            (week_start, now, timedelta(days=1)),
+        ],
+    )
 
     summary = {
         "day": _format_utilization_metrics(day_totals),
@@ -1239,7 +2594,7 @@ def location_usage(
         week_summary = _format_utilization_metrics(rollup["week_totals"])
         port_count = len(rollup["port_ids"])
         if not port_count:
-            port_count = int(rollup["week_totals"].get("port_count", 0))
+            port_count = int(rollup["week_totals"].port_count)
         station_payload: Dict[str, Any] = {
             "station_id": rollup["station_id"],
             "port_count": port_count,
@@ -1252,6 +2607,7 @@ def location_usage(
 
     station_entries.sort(key=lambda row: row.get("station_id") or "")
 
+    now_iso = now.isoformat()
     return {
         "location_id": location_id,
         "station_count": len({sid for sid in station_ids if sid is not None}),
@@ -1259,17 +2615,17 @@ def location_usage(
         "summary": summary,
         "usage_day": {
             "start": day_start.isoformat(),
-            "end": now.isoformat(),
+            "end": now_iso,
             "bucket_minutes": 60,
             "timeline": day_timeline,
         },
         "usage_week": {
             "start": week_start.isoformat(),
-            "end": now.isoformat(),
+            "end": now_iso,
             "bucket_days": 1,
             "timeline": week_timeline,
         },
-        "updated": now.isoformat(),
+        "updated": now_iso,
         "stations": station_entries,
     }
 
@@ -1308,7 +2664,7 @@ def station_fingerprint(
     """Compute a 4-week fingerprint heatmap for a station."""
 
     if reference is None:
-        reference = datetime.now().astimezone()
+        reference = _local_now()
     if reference.tzinfo is None:
         reference = reference.replace(tzinfo=timezone.utc)
 
@@ -1358,7 +2714,7 @@ def station_fingerprint(
         cursor += timedelta(hours=1)
 
     compute_start = min(missing_starts) if missing_starts else None
-    computed_totals: Dict[datetime, Dict[str, float]] = {}
+    computed_totals: Dict[datetime, UsageTotals] = {}
     computed_port_count = 0
     if compute_start is not None:
         history = _station_history_between(
@@ -1382,22 +2738,16 @@ def station_fingerprint(
                     if bucket_end <= current:
                         break
                     duration = (bucket_end - current).total_seconds()
-                    totals = computed_totals.setdefault(bucket_start, _empty_totals())
-                    totals["monitored_seconds"] = (
-                        totals.get("monitored_seconds", 0.0) + duration
-                    )
-                    if status is not None and status not in UNAVAILABLE_STATUSES:
-                        totals["available_seconds"] = (
-                            totals.get("available_seconds", 0.0) + duration
-                        )
-                    if status in OCCUPIED_STATUSES:
-                        totals["occupied_seconds"] = (
-                            totals.get("occupied_seconds", 0.0) + duration
-                        )
-                    if status in ACTIVE_CHARGING_STATUSES:
-                        totals["active_seconds"] = (
-                            totals.get("active_seconds", 0.0) + duration
-                        )
+                    totals = computed_totals.get(bucket_start)
+                    if totals is None:
+                        totals = computed_totals[bucket_start] = UsageTotals()
+                    totals.monitored_seconds += duration
+                    if status not in UNAVAILABLE_OR_MISSING_CODES:
+                        totals.available_seconds += duration
+                    if status in OCCUPIED_CODES:
+                        totals.occupied_seconds += duration
+                    if status in ACTIVE_CHARGING_CODES:
+                        totals.active_seconds += duration
                     current = bucket_end
 
     port_count = max(previous_port_count, computed_port_count)
@@ -1424,16 +2774,16 @@ def station_fingerprint(
     while current < end:
         bucket_end = current + timedelta(hours=1)
         if current in computed_totals:
-            totals = computed_totals.get(current, _empty_totals())
+            totals = computed_totals[current]
             metrics = (
                 _format_utilization_metrics(totals)
-                if totals.get("monitored_seconds")
+                if totals.monitored_seconds
                 else _empty_metrics()
             )
-            metrics["monitored_seconds"] = totals.get("monitored_seconds", 0.0)
-            metrics["available_seconds"] = totals.get("available_seconds", 0.0)
-            metrics["occupied_seconds"] = totals.get("occupied_seconds", 0.0)
-            metrics["active_seconds"] = totals.get("active_seconds", 0.0)
+            metrics["monitored_seconds"] = totals.monitored_seconds
+            metrics["available_seconds"] = totals.available_seconds
+            metrics["occupied_seconds"] = totals.occupied_seconds
+            metrics["active_seconds"] = totals.active_seconds
             coverage = (
                 metrics["monitored_seconds"] / total_capacity_seconds
                 if total_capacity_seconds
@@ -1487,7 +2837,7 @@ def station_fingerprint(
         cells.append(cell)
         current = bucket_end
 
-    generated = datetime.now().astimezone()
+    generated = _local_now()
 
     def _top_cells(desc: bool) -> List[Dict[str, Any]]:
         filtered = [
@@ -1625,7 +2975,7 @@ def schedule_station_fingerprints(conn: Connection, scheduled_for: datetime) ->
     if not stations:
         return 0
     scheduled_iso = scheduled_for.isoformat(timespec="seconds")
-    now_iso = datetime.now().astimezone().isoformat(timespec="seconds")
+    now_iso = _local_now().isoformat(timespec="seconds")
     rows = [
         (
             loc,
@@ -1672,7 +3022,7 @@ def dequeue_station_fingerprint_job(
     """Claim the next pending fingerprint job."""
 
     if now is None:
-        now = datetime.now().astimezone()
+        now = _local_now()
     now_iso = now.isoformat(timespec="seconds")
     with _with_cursor(conn) as cur:
         cur.execute(
@@ -1724,7 +3074,7 @@ def complete_station_fingerprint_job(
 ) -> None:
     """Mark a fingerprint job as completed or failed."""
 
-    now_iso = datetime.now().astimezone().isoformat(timespec="seconds")
+    now_iso = _local_now().isoformat(timespec="seconds")
     completed_iso = now_iso if status == "completed" else None
     with _with_cursor(conn) as cur:
         cur.execute(
@@ -1741,42 +3091,64 @@ def complete_station_fingerprint_job(
     conn.commit()
 
 
-def stats_from_db(conn: Connection, *, now: datetime | None = None) -> Dict[str, Any]:
+# All-time session and short session counts; open sessions are measured to now
+_SESSION_TOTALS_QUERY = """
+    SELECT
+        COUNT(*),
+        COALESCE(SUM(
+            COALESCE(duration_min, TIMESTAMPDIFF(MICROSECOND, start_ts, %(now)s) / 60e6)
+            < %(short)s
+        ), 0)
+    FROM port_sessions
+    WHERE start_ts <= %(now)s
+"""
+
+
+def stats_from_db(
+    conn: Connection,
+    *,
+    now: datetime | None = None,
+    history: Dict[PortKey, List[Tuple[datetime, int]]] | None = None,
+) -> Dict[str, Any]:
     if now is None:
-        now = datetime.now().astimezone()
+        now = _local_now()
     latest = _latest_records(conn)
     stats = stats_mod.from_records(latest)
-    history = _all_history(conn)
-    stats["sessions"] = sum(len(_session_durations(v, now=now)) for v in history.values())
-    stats["short_sessions"] = sum(
-        len(
-            [
-                d
-                for d in _session_durations(v, now=now)
-                if d < stats_mod.SHORT_SESSION_MAX_MIN
-            ]
-        )
-        for v in history.values()
-    )
+    # Older rows are downsampled to one per day, too coarse for sessions
+    since_medium = now - timedelta(days=MEDIUM_DETAIL_DAYS)
+    if history is None:
+        history = _recent_status_history(conn, since_medium)
+    else:
+        history = _history_window(history, since_medium)
 
     since = now - timedelta(hours=24)
-    durations: List[float] = []
-    for events in history.values():
-        for start, end, dur in _session_records(events):
-            if start >= since:
-                durations.append(dur)
-    stats["avg_session_min"] = sum(durations) / len(durations) if durations else 0.0
-
     today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    with _with_cursor(conn) as cur:
+        cur.execute(
+            _SESSION_TOTALS_QUERY, {"now": now, "short": stats_mod.SHORT_SESSION_MAX_MIN}
+        )
+        sessions, short_sessions = cur.fetchone()
+    recent_duration_total = 0.0
+    recent_count = 0
     charges_today = 0
     for events in history.values():
-        for start, _, _ in _session_records(events):
+        for start, _, dur in _session_records(events):
+            if start >= since:
+                recent_duration_total += dur
+                recent_count += 1
             if start >= today:
                 charges_today += 1
+    stats["sessions"] = int(sessions)
+    stats["short_sessions"] = int(short_sessions)
+    stats["avg_session_min"] = recent_duration_total / recent_count if recent_count else 0.0
     stats["charges_today"] = charges_today
-    station_histories: Dict[Tuple[str | None, str | None], Dict[str | None, List[Tuple[datetime, str]]]] = {}
+    station_histories: Dict[
+        Tuple[str | None, str | None], Dict[str | None, List[Tuple[datetime, int]]]
+    ] = defaultdict(dict)
     for (loc, sta, port), events in history.items():
-        station_histories.setdefault((loc, sta), {})[port] = events
+        station_histories[(loc, sta)][port] = events
+    # Outages are only known from the history, so MTTR covers the last
+    # MEDIUM_DETAIL_DAYS rather than all time
     outage_durations: List[float] = []
     for events in station_histories.values():
         outage_durations.extend(_station_outage_durations(events, now=now))
@@ -1787,148 +3159,209 @@ def stats_from_db(conn: Connection, *, now: datetime | None = None) -> Dict[str,
     return stats
 
 
-def timeline_stats(conn: Connection, rules: Rules | None = None) -> List[Dict[str, Any]]:
-    since = datetime.now().astimezone() - timedelta(days=7)
+def _slot_status_counts(
+    history: Dict[PortKey, List[Tuple[datetime, int]]],
+    slot_ends: Sequence[datetime],
+) -> Tuple[List[int], List[int], List[int]]:
+    """Count reporting, unavailable and charging ports at each of ``slot_ends``.
+
+    ``slot_ends`` must be sorted. Each event holds its status for the slots
+    ending before the port's next event, so the counts are accumulated as
+    per-event slot ranges instead of looking every port up for every slot.
+    """
+
+    size = len(slot_ends)
+    chargers = [0] * (size + 1)
+    unavailable = [0] * (size + 1)
+    charging = [0] * (size + 1)
+    for events in history.values():
+        hi = size
+        # Walk backwards so each event's range ends where the next one starts
+        for ts, status in reversed(events):
+            lo = bisect_left(slot_ends, ts, hi=hi)
+            if lo < hi and status != MISSING_STATUS_CODE:
+                chargers[lo] += 1
+                chargers[hi] -= 1
+                if status in UNAVAILABLE_CODES:
+                    unavailable[lo] += 1
+                    unavailable[hi] -= 1
+                if status == IN_USE_CODE:
+                    charging[lo] += 1
+                    charging[hi] -= 1
+            hi = lo
+            if not hi:
+                break
+    return (
+        list(accumulate(chargers[:size])),
+        list(accumulate(unavailable[:size])),
+        list(accumulate(charging[:size])),
+    )
+
+
+def timeline_stats(
+    conn: Connection,
+    rules: Rules | None = None,
+    *,
+    now: datetime | None = None,
+    history: Dict[PortKey, List[Tuple[datetime, int]]] | None = None,
+) -> List[Dict[str, Any]]:
+    if now is None:
+        now = _local_now()
+    since = now - timedelta(days=TIMELINE_DAYS)
     if rules is None:
         rules = Rules()
-    history_span = max(
-        rules.unused_days,
-        rules.long_session_days,
-        rules.unavailable_hours / 24,
-    )
-    full_history = _recent_status_history(
-        conn,
-        since - timedelta(days=history_span),
+    earliest = since - _rules_lookback(rules)
+    if history is None:
+        full_history = _recent_status_history(conn, earliest)
+    else:
+        full_history = _history_window(history, earliest)
+    # Collect quarter-hour slot numbers as ints and build datetimes only for
+    # the distinct slots; each port's events before ``since`` are skipped.
+    slot_numbers: set[int] = set()
+    ts_key = itemgetter(0)
+    for events in full_history.values():
+        start = bisect_left(events, since, key=ts_key)
+        slot_numbers.update(int(ts.timestamp()) // 900 for ts, _ in islice(events, start, None))
+    slots = [
+        datetime.fromtimestamp(number * 900, tz=timezone.utc) for number in sorted(slot_numbers)
+    ]
+    slot_ends = [slot_ts + timedelta(minutes=15) for slot_ts in slots]
+    problematic_counts = analyze_chargers_series(conn, rules, slot_ends, full_history)
+
+    chargers_by_slot, unavailable_by_slot, charging_by_slot = _slot_status_counts(
+        full_history, slot_ends
     )
-    slot_set = {
-        datetime.fromtimestamp(
-            (int(ts.timestamp()) // 900) * 900, tz=timezone.utc
+
+    # Index every station once so each slot is answered by bisection
+    station_first: Dict[Tuple[str | None, str | None], datetime] = {}
+    station_in_use: Dict[Tuple[str | None, str | None], List[datetime]] = defaultdict(list)
+    for (loc, sta, _port), events in full_history.items():
+        if not events:
+            continue
+        station_key = (loc, sta)
+        first = station_first.get(station_key)
+        if first is None or events[0][0] < first:
+            station_first[station_key] = events[0][0]
+        station_in_use[station_key].extend(
+            ts for ts, status in events if status == IN_USE_CODE
         )
-        for events in full_history.values()
-        for ts, _ in events
-        if ts >= since
-    }
-    slots = sorted(slot_set)
+    for in_use in station_in_use.values():
+        in_use.sort()
+    unused_windows = [timedelta(days=days) for days in TIMELINE_UNUSED_DAYS]
+
     result: List[Dict[str, Any]] = []
-    for slot_ts in slots:
-        slot_end = slot_ts + timedelta(minutes=15)
-        chargers = 0
-        unavailable = 0
-        charging = 0
-        for events in full_history.values():
-            status = None
-            for ts, st in events:
-                if ts <= slot_end:
-                    status = st
-                else:
-                    break
-            if status is None:
+    for index, (slot_ts, slot_end) in enumerate(zip(slots, slot_ends)):
+        # A station counts for a window once its history reaches the window's
+        # cutoff and it has not been in use since then.
+        cutoffs = [slot_end - window for window in unused_windows]
+        unused_counts = [0] * len(cutoffs)
+        for station_key, first in station_first.items():
+            if first > slot_end:
                 continue
-            chargers += 1
-            if status in UNAVAILABLE_STATUSES:
-                unavailable += 1
-            if status == "IN_USE":
-                charging += 1
-        problematic, _ = analyze_chargers(
-            conn,
-            rules,
-            now=slot_end,
-            history=full_history,
-        )
+            in_use = station_in_use.get(station_key, [])
+            position = bisect_right(in_use, slot_end)
+            last_in_use = in_use[position - 1] if position else None
+            for window_index, cutoff in enumerate(cutoffs):
+                if first <= cutoff and (last_in_use is None or last_in_use < cutoff):
+                    unused_counts[window_index] += 1
+        unused_1, unused_2, unused_7 = unused_counts
         result.append(
             {
                 "ts": slot_ts.isoformat(),
-                "chargers": chargers,
-                "unavailable": unavailable,
-                "charging": charging,
-                "problematic": len(problematic),
-                "unused_1": _count_unused_chargers(
-                    conn,
-                    1,
-                    slot_end,
-                    history=full_history,
-                ),
-                "unused_2": _count_unused_chargers(
-                    conn,
-                    2,
-                    slot_end,
-                    history=full_history,
-                ),
-                "unused_7": _count_unused_chargers(
-                    conn,
-                    7,
-                    slot_end,
-                    history=full_history,
-                ),
+                "chargers": chargers_by_slot[index],
+                "unavailable": unavailable_by_slot[index],
+                "charging": charging_by_slot[index],
+                "problematic": problematic_counts[index],
+                "unused_1": unused_1,
+                "unused_2": unused_2,
+                "unused_7": unused_7,
             }
         )
     return result
 
 
+_CHARGER_SESSIONS_QUERY = """
+    SELECT port_id, start_ts, end_ts, duration_min
+    FROM (
+        SELECT
+            port_id,
+            start_ts,
+            end_ts,
+            duration_min,
+            ROW_NUMBER() OVER (PARTITION BY port_id ORDER BY start_ts DESC) AS rn
+        FROM port_sessions
+        WHERE location_id <=> %s AND station_id <=> %s
+          AND start_ts >= %s AND end_ts IS NOT NULL
+    ) recent
+    WHERE rn <= %s
+    ORDER BY port_id, start_ts DESC
+"""
+
+
 def charger_sessions(
     conn: Connection,
     location_id: str | None,
     station_id: str | None,
     limit: int = 10,
+    *,
+    now: datetime | None = None,
 ) -> Dict[str | None, List[Dict[str, Any]]]:
-    since = datetime.now().astimezone() - timedelta(days=MEDIUM_DETAIL_DAYS)
-    history: Dict[str | None, List[Tuple[datetime, str]]] = {}
+    if now is None:
+        now = _local_now()
+    since = now - timedelta(days=MEDIUM_DETAIL_DAYS)
+    result: Dict[str | None, List[Dict[str, Any]]] = {
+        port_id: [] for port_id in _distinct_station_ports(conn, location_id, station_id)
+    }
     with _with_cursor(conn) as cur:
-        cur.execute(
-            """
-            SELECT port_id, ts, status
-            FROM port_status
-            WHERE location_id <=> %s AND station_id <=> %s AND ts >= %s
-            ORDER BY port_id, ts
-            """,
-            (location_id, station_id, since.isoformat()),
-        )
-        for port, ts_str, status in cur.fetchall():
-            history.setdefault(port, []).append((datetime.fromisoformat(ts_str), status))
-    result: Dict[str | None, List[Dict[str, Any]]] = {}
-    for port, events in history.items():
-        sessions = _session_records(events)
-        sessions.sort(key=lambda r: r[0], reverse=True)
-        trimmed = sessions[:limit]
-        result[port] = [
-            {
-                "start": s.isoformat(timespec="seconds"),
-                "end": e.isoformat(timespec="seconds"),
-                "duration": dur,
-            }
-            for s, e, dur in trimmed
-        ]
+        cur.execute(_CHARGER_SESSIONS_QUERY, (location_id, station_id, since, limit))
+        for port, start, end, duration in cur.fetchall():
+            result.setdefault(port, []).append(
+                {
+                    "start": start.isoformat(timespec="seconds"),
+                    "end": end.isoformat(timespec="seconds"),
+                    "duration": duration,
+                }
+            )
     return result
 
 
+_SESSION_STARTS_QUERY = """
+    SELECT FLOOR(UNIX_TIMESTAMP(start_ts) / 900) AS slot, COUNT(*)
+    FROM port_sessions
+    WHERE start_ts >= %s
+    GROUP BY slot
+"""
+
+
 def sessions_time_series(
     conn: Connection,
     days: int = 7,
     granularity: str = "day",
+    *,
+    now: datetime | None = None,
 ) -> List[Dict[str, Any]]:
+    """Return session counts per local day or hour over the last ``days``.
+
+    Sessions are counted in the bucket of their recorded start; a session
+    already running at the start of the window is not counted.
+    """
+
     granularity = granularity.lower()
     if granularity not in {"day", "hour"}:
         raise ValueError(f"Unsupported granularity '{granularity}'")
 
-    now = datetime.now().astimezone()
+    # Buckets are keyed in local time, so ``now`` must be too
+    now = _local_now() if now is None else now.astimezone()
     if granularity == "hour":
         since = (now - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
     else:
         since = now - timedelta(days=days)
 
-    history: Dict[PortKey, List[Tuple[datetime, str]]] = {}
+    # Session starts are counted per UTC quarter hour, which every local hour
+    # and day boundary aligns with, and regrouped locally below.
     with _with_cursor(conn) as cur:
-        cur.execute(
-            """
-            SELECT location_id, station_id, port_id, ts, status
-            FROM port_status
-            WHERE ts >= %s
-            ORDER BY location_id, station_id, port_id, ts
-            """,
-            (since.isoformat(),),
-        )
-        for loc, sta, port, ts_str, status in cur.fetchall():
-            history.setdefault((loc, sta, port), []).append((datetime.fromisoformat(ts_str), status))
+        cur.execute(_SESSION_STARTS_QUERY, (since,))
+        rows = cur.fetchall()
 
     counts: Dict[str, int] = {}
 
@@ -1938,30 +3371,25 @@ def sessions_time_series(
             return ts_local.replace(minute=0, second=0, microsecond=0)
         return ts_local.replace(hour=0, minute=0, second=0, microsecond=0)
 
-    for events in history.values():
-        last_status: str | None = None
-        for ts, status in events:
-            if status == "IN_USE" and last_status != "IN_USE" and ts >= since:
-                bucket = _bucket_start(ts)
-                key = bucket.isoformat()
-                counts[key] = counts.get(key, 0) + 1
-            last_status = status
+    for slot, starts in rows:
+        slot_start = datetime.fromtimestamp(int(slot) * 900, tz=timezone.utc)
+        key = _bucket_start(slot_start).isoformat()
+        counts[key] = counts.get(key, 0) + int(starts)
 
     result: List[Dict[str, Any]] = []
     if granularity == "hour":
         start = (now - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
         end = now.replace(minute=0, second=0, microsecond=0)
+        hour_keys: List[str] = []
         current = start
         while current <= end:
-            key = current.isoformat()
-            result.append(
-                {
-                    "start": key,
-                    "end": (current + timedelta(hours=1)).isoformat(),
-                    "sessions": counts.get(key, 0),
-                }
-            )
+            hour_keys.append(current.isoformat())
             current += timedelta(hours=1)
+        # Each bucket ends where the next one starts, so only the final end
+        # needs formatting separately.
+        hour_keys.append(current.isoformat())
+        for key, end_key in zip(hour_keys, hour_keys[1:]):
+            result.append({"start": key, "end": end_key, "sessions": counts.get(key, 0)})
     else:
         for i in range(days - 1, -1, -1):
             day_start = (now - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
@@ -1976,8 +3404,10 @@ def sessions_time_series(
     return result
 
 
-def sessions_per_day(conn: Connection, days: int = 7) -> List[Dict[str, Any]]:
-    series = sessions_time_series(conn, days=days, granularity="day")
+def sessions_per_day(
+    conn: Connection, days: int = 7, *, now: datetime | None = None
+) -> List[Dict[str, Any]]:
+    series = sessions_time_series(conn, days=days, granularity="day", now=now)
     return [
         {
             "day": datetime.fromisoformat(entry["start"]).date().isoformat(),
@@ -25,6 +25,8 @@ def conn(db_url):
     with connection.cursor() as cur:
         cur.execute("DELETE FROM station_fingerprint_heatmap")
         cur.execute("DELETE FROM station_fingerprint_jobs")
+        cur.execute("DELETE FROM port_sessions")
+        cur.execute("DELETE FROM port_latest_status")
         cur.execute("DELETE FROM port_status")
     connection.commit()
     yield connection
@@ -12,6 +12,8 @@ def _seed_database(db_url: str) -> None:
     conn = storage.connect(db_url)
     try:
         with conn.cursor() as cur:
+            cur.execute("DELETE FROM port_sessions")
+            cur.execute("DELETE FROM port_latest_status")
             cur.execute("DELETE FROM port_status")
         conn.commit()
         base = datetime.now(timezone.utc) - timedelta(hours=2)
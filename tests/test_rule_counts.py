@@ -48,3 +48,10 @@ def test_rule_counts(conn):
     assert counts["no_long"] == 2
     assert counts["unavailable"] == 1
     assert len(problematic) == 3
+
+    slot_ends = [now - timedelta(hours=12), now - timedelta(hours=1), now]
+    expected = [
+        len(storage.analyze_chargers(conn, rules, now=slot_end)[0]) for slot_end in slot_ends
+    ]
+    assert storage.analyze_chargers_series(conn, rules, slot_ends) == expected
+    assert expected[-1] == 3
@@ -66,6 +66,27 @@ def test_count_short_sessions(conn):
     assert stats["charges_today"] == 1
 
 
+def test_sessions_count_includes_old_sessions(conn):
+    now = datetime.now(timezone.utc)
+    old_start = now - timedelta(days=storage.MEDIUM_DETAIL_DAYS + 10)
+
+    for ts, status in [
+        (old_start, "IN_USE"),
+        (old_start + timedelta(minutes=3), "AVAILABLE"),
+        (now - timedelta(minutes=20), "IN_USE"),
+    ]:
+        storage.save_snapshot(
+            conn,
+            [{"location_id": "L1", "station_id": "S1", "port_id": "P1", "status": status}],
+            ts=ts,
+        )
+
+    stats = storage.stats_from_db(conn, now=now)
+    assert stats["sessions"] == 2
+    # Only the old three minute session is short; the open one has run for 20
+    assert stats["short_sessions"] == 1
+
+
 def test_mttr_station(conn):
     now = datetime.now(timezone.utc)
 
@@ -197,6 +218,67 @@ def test_sessions_time_series_hourly(conn):
     assert target_bucket["sessions"] >= 1
 
 
+
+def test_sessions_time_series_non_local_now(conn):
+    local_offset = datetime.now().astimezone().utcoffset()
+    now = datetime.now(timezone(local_offset + timedelta(hours=5)))
+    start = now - timedelta(hours=2)
+
+    for ts, status in [(start, "IN_USE"), (start + timedelta(minutes=30), "AVAILABLE")]:
+        storage.save_snapshot(
+            conn,
+            [
+                {
+                    "location_id": "L1",
+                    "station_id": "S1",
+                    "port_id": "P1",
+                    "status": status,
+                    "last_updated": ts.isoformat(),
+                }
+            ],
+            ts=ts,
+        )
+
+    series = storage.sessions_time_series(conn, days=1, granularity="hour", now=now)
+    assert sum(entry["sessions"] for entry in series) == 1
+
+    start_key = start.astimezone().replace(minute=0, second=0, microsecond=0).isoformat()
+    assert next(entry for entry in series if entry["start"] == start_key)["sessions"] == 1
+
+
+def test_session_spanning_window_start_is_not_counted(conn):
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(days=1)
+
+    snapshots = [
+        (since - timedelta(hours=1), "IN_USE"),
+        (since + timedelta(hours=1), "AVAILABLE"),
+        (now - timedelta(hours=2), "IN_USE"),
+        (now - timedelta(hours=1), "AVAILABLE"),
+    ]
+
+    for ts, status in snapshots:
+        storage.save_snapshot(
+            conn,
+            [
+                {
+                    "location_id": "L1",
+                    "station_id": "S1",
+                    "port_id": "P1",
+                    "status": status,
+                    "last_updated": ts.isoformat(),
+                }
+            ],
+            ts=ts,
+        )
+
+    sessions = storage.recent_sessions(conn, since, now=now)
+    assert sessions[("L1", "S1", "P1")] == [pytest.approx(60.0)]
+
+    series = storage.sessions_time_series(conn, days=1, granularity="hour", now=now)
+    assert sum(entry.get("sessions", 0) for entry in series) == 1
+
+
 def test_utilization_metrics(conn):
     now = datetime.now(timezone.utc)
 
@@ -258,3 +340,24 @@ def test_utilization_metrics(conn):
     assert network["station_count"] == 1
     assert network["location_count"] == 1
     assert network["session_count_per_day"] == pytest.approx(9.6, rel=1e-6)
+
+
+def test_port_utilization_uses_shared_process_pool(monkeypatch):
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(hours=2)
+    history = {
+        ("L1", f"S{i}", "P1"): [
+            (start, storage.STATUS_CODES["AVAILABLE"]),
+            (start + timedelta(minutes=i % 60), storage.STATUS_CODES["IN_USE"]),
+        ]
+        for i in range(storage.PORT_CHUNK_SIZE + 1)
+    }
+
+    monkeypatch.setenv(storage.ANALYSIS_WORKERS_ENV, "1")
+    serial = storage._port_utilization_totals(history, now=now)
+
+    monkeypatch.setenv(storage.ANALYSIS_WORKERS_ENV, "2")
+    assert storage._port_utilization_totals(history, now=now) == serial
+    executor = storage._analysis_executor(2)
+    assert storage._port_utilization_totals(history, now=now) == serial
+    assert storage._analysis_executor(2) is executor
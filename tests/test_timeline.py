@@ -63,3 +63,21 @@ def test_timeline_stats(conn):
     assert second["charging"] == 1
     assert second["unavailable"] == 0
     assert second["problematic"] == 0
+
+
+def test_timeline_stats_with_shared_history(conn):
+    now = datetime.now(timezone.utc)
+    for hours, status in ((30, "AVAILABLE"), (20, "IN_USE"), (2, "AVAILABLE")):
+        storage.save_snapshot(
+            conn,
+            [{"location_id": "L1", "station_id": "S1", "port_id": "P1", "status": status}],
+            ts=now - timedelta(hours=hours),
+        )
+
+    history = storage.analysis_history(conn, now=now)
+    assert storage.timeline_stats(conn, now=now, history=history) == storage.timeline_stats(
+        conn, now=now
+    )
+    assert storage.stats_from_db(conn, now=now, history=history) == storage.stats_from_db(
+        conn, now=now
+    )
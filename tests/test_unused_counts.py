@@ -49,3 +49,4 @@ def test_count_unused_chargers(conn):
     count_2 = storage._count_unused_chargers(conn, 2, now)
     assert count_1 == 2
     assert count_2 == 1
+    assert storage._count_unused_chargers_multi(conn, (1, 2), now) == (2, 1)